@@ -0,0 +1,113 @@
+# Load benchmark for the Flask API (scoreboard_web/server.py).
+#
+#   python bench/bench_api.py [--threads 8] [--requests 4000] [-o out.json]
+#
+# Drives the routes through the Flask test client from several threads
+# against a temporary state file and a fake cec-client, and reports
+# requests per second and latency percentiles per route.
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from bench_common import REPO_DIR, percentiles, write_results
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TEAMS = [
+    {"name": "Team 1", "score": 0, "color": [91, 124, 255]},
+    {"name": "Team 2", "score": 0, "color": [214, 76, 76]},
+]
+
+# (name, weight, method, path, json body)
+ROUTES = [
+    ("get_state", 40, "GET", "/get_state", None),
+    ("scoreboard_update", 10, "POST", "/scoreboard/update", {"teams": TEAMS}),
+    ("ops_score", 10, "POST", "/ops", {"ops": [{"op": "score", "team": 0, "delta": 1}]}),
+    ("stopwatch_toggle", 8, "POST", "/stopwatch/toggle", None),
+    ("game_clock_toggle", 8, "POST", "/game_clock/toggle", None),
+    ("timer_update", 8, "POST", "/timer/update", {"duration": 600, "running": False}),
+    ("hdmi_status", 6, "GET", "/hdmi/status", None),
+    ("stopwatch_page", 5, "GET", "/stopwatch", None),
+    ("tv_on", 5, "GET", "/tv/on", None),
+]
+
+
+def load_server(state_dir):
+    # Import server.py against a temporary state file and a fake cec-client
+    state_file = os.path.join(state_dir, "state.json")
+    with open(state_file, "w") as f:
+        json.dump({"mode": "index", "teams": TEAMS, "message": "Nachricht"}, f)
+
+    os.environ["SCOREBOARD_STATE_FILE"] = state_file
+    os.environ["CEC_CLIENT"] = f"{sys.executable} {os.path.join(BENCH_DIR, 'fake_cec_client.py')}"
+    sys.path.insert(0, os.path.join(REPO_DIR, "scoreboard_web"))
+    import server
+    return server
+
+
+def worker(app, requests, seed, samples, lock):
+    client = app.test_client()
+    rng = random.Random(seed)
+    names, weights = zip(*[(route[0], route[1]) for route in ROUTES])
+    by_name = {route[0]: route for route in ROUTES}
+    local = {name: [] for name in names}
+
+    for _ in range(requests):
+        name, _, method, path, body = by_name[rng.choices(names, weights)[0]]
+        t0 = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        local[name].append((time.perf_counter() - t0) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} -> {response.status_code}")
+
+    with lock:
+        for name, values in local.items():
+            samples[name].extend(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask API load benchmark")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=4000, help="total requests")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        server = load_server(state_dir)
+
+        samples = {route[0]: [] for route in ROUTES}
+        lock = threading.Lock()
+        per_thread = args.requests // args.threads
+        threads = [
+            threading.Thread(target=worker, args=(server.app, per_thread, i, samples, lock))
+            for i in range(args.threads)
+        ]
+
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        server.boards.close()
+        server.cec.close()
+
+    all_samples = [value for values in samples.values() for value in values]
+    write_results("api", {
+        "threads": args.threads,
+        "requests": len(all_samples),
+        "seconds": elapsed,
+        "requests_per_second": len(all_samples) / elapsed,
+        "overall": percentiles(all_samples),
+        "routes": {name: percentiles(values) for name, values in samples.items()},
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
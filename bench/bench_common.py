@@ -0,0 +1,60 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(samples_ms):
+    # Summary of a list of durations in milliseconds
+    if not samples_ms:
+        return {"count": 0}
+
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": ordered[-1],
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name, results, output=None):
+    # Writes the results as JSON (to 'output' or stdout), together with
+    # enough metadata to compare runs between versions.
+    report = {
+        "benchmark": name,
+        "revision": git_revision(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
@@ -0,0 +1,115 @@
+# Frame-time benchmark for the display renderer (scoreboard/renderer.py).
+#
+#   python bench/bench_renderer.py [--frames 600] [--size 1920x1080] [-o out.json]
+#
+# Runs headless with the SDL dummy video driver and reports frame-time
+# percentiles for every mode.
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from bench_common import REPO_DIR, percentiles, write_results
+
+sys.path.insert(0, os.path.join(REPO_DIR, "scoreboard"))
+sys.path.insert(0, os.path.join(REPO_DIR, "shared"))
+
+import pygame
+
+from clocks import Instant, current_instant, default_clocks, read_clocks, reset_clock, start_clock
+from renderer import Renderer
+
+SHORT_MESSAGE = "Halbzeit"
+LONG_MESSAGE = " ".join(
+    ["Bitte alle Mannschaften nach dem Spiel zur Siegerehrung in die Halle kommen."] * 12
+)
+
+TEAMS = [
+    {"name": "Team 1", "score": 12, "color": [91, 124, 255]},
+    {"name": "Team 2", "score": 9, "color": [214, 76, 76]},
+]
+
+
+def scenarios(start):
+    # name -> state; every running clock was started at Instant 'start'
+    clocks = default_clocks()
+    reset_clock(clocks["timer"], 600)
+    for clock in clocks.values():
+        start_clock(clock, start)
+
+    return {
+        "index": {"mode": "index", "clocks": clocks},
+        "stopwatch": {"mode": "stopwatch", "clocks": clocks},
+        "timer": {"mode": "timer", "clocks": clocks},
+        "message_short": {"mode": "message", "message": SHORT_MESSAGE, "clocks": clocks},
+        "message_long": {"mode": "message", "message": LONG_MESSAGE, "clocks": clocks},
+        "scores_and_teams": {"mode": "scores_and_teams", "teams": TEAMS, "clocks": clocks},
+        "ticker": {
+            "mode": "ticker", "ticker": {"messages": [SHORT_MESSAGE, LONG_MESSAGE], "speed": 240},
+            "clocks": clocks,
+        },
+    }
+
+
+def run_scenario(width, height, state, start, frames, full_redraw, frame_interval):
+    # A fresh renderer per scenario, so the first frame includes all
+    # caching work ("cold_ms"). Time is simulated from 'start' on; the
+    # clocks are evaluated per frame like the display loop does.
+    renderer = Renderer(width, height)
+    surface = pygame.Surface((width, height))
+
+    samples = []
+    dirty_pixels = 0
+    for i in range(frames):
+        t0 = time.perf_counter()
+        instant = Instant(start.wall + i * frame_interval, start.mono + i * frame_interval)
+        clocks = read_clocks(state, instant)
+        dirty = renderer.draw(surface, state, instant.wall, clocks, full=full_redraw)
+        samples.append((time.perf_counter() - t0) * 1000)
+        dirty_pixels += sum(rect.width * rect.height for rect in dirty)
+
+    result = percentiles(samples[1:])
+    result["cold_ms"] = samples[0]
+    result["dirty_fraction"] = dirty_pixels / (frames * width * height)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Display renderer benchmark")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--size", default="1920x1080", help="WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, default=60, help="simulated frame rate")
+    parser.add_argument("--full-redraw", action="store_true")
+    parser.add_argument("--only", action="append", help="run only this scenario (repeatable)")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((1, 1))
+
+    results = {}
+    start = current_instant()
+    for name, state in scenarios(start).items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = run_scenario(
+            width, height, state, start, args.frames, args.full_redraw, 1 / args.fps
+        )
+
+    write_results("renderer", {
+        "size": [width, height],
+        "frames": args.frames,
+        "full_redraw": args.full_redraw,
+        "scenarios": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Compares two benchmark result files written by bench_renderer.py or
+# bench_api.py (e.g. before/after a change).
+#
+#   python bench/compare.py old.json new.json
+import argparse
+import json
+
+# Metrics where lower is better; everything else is only shown
+TIME_METRICS = ("mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms", "cold_ms")
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, name + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark results")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old['benchmark']}: {old.get('revision')} -> {new.get('revision')}")
+    old_values = dict(flatten(old["results"]))
+    for name, value in flatten(new["results"]):
+        if name not in old_values:
+            continue
+        before = old_values[name]
+        change = ""
+        if before:
+            ratio = value / before
+            marker = ""
+            if name.endswith(TIME_METRICS) and ratio > 1.1:
+                marker = "  slower"
+            change = f"{ratio:6.2f}x{marker}"
+        print(f"{name:45} {before:12.4f} {value:12.4f}  {change}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# Stand-in for cec-client when there is no CEC adapter (tests, benchmarks).
+#
+#   CEC_CLIENT="python bench/fake_cec_client.py --log /tmp/cec.log" python scoreboard_web/server.py
+#
+# Reads commands from stdin like 'cec-client -d 1', appends every command
+# to the log file (if given) and exits on "q".
+import argparse
+import sys
+import time
+
+parser = argparse.ArgumentParser(description="Fake cec-client")
+parser.add_argument("--log", help="file every received command is appended to")
+parser.add_argument(
+    "--open-delay", type=float, default=0.0,
+    help="seconds to wait before reading commands (opening the adapter)"
+)
+parser.add_argument(
+    "--command-delay", type=float, default=0.0,
+    help="seconds each command takes"
+)
+args = parser.parse_args()
+
+time.sleep(args.open_delay)
+
+for line in sys.stdin:
+    command = line.strip()
+    if command == "q":
+        break
+    time.sleep(args.command_delay)
+    if args.log:
+        with open(args.log, "a") as f:
+            f.write(command + "\n")
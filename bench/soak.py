@@ -0,0 +1,404 @@
+# Soak test for the server (scoreboard_web/server.py) under concurrent use.
+#
+#   python bench/soak.py [--clients 16] [--requests 5000] [--persistence log] [-o out.json]
+#
+# Starts the server over real HTTP against a temporary state file and a
+# fake cec-client, plus a headless display reader (a second process that
+# follows the state like scoreboard_screen.py: the state socket, and
+# state.json read directly alongside). Then several clients fire a mix of
+# score changes, clock toggles, timer updates, mode switches and reads.
+#
+# Every request's effect is known, so at the end the state must match
+# exactly. This is checked three times: in /get_state, in the last state
+# the reader saw, and in state.json after the server was stopped (it
+# flushes on exit). The reader reports torn reads (unparsable messages or
+# files) and states that went backwards: a lower version, or a lower
+# score, since scores only ever go up here. Exits with 1 if a check fails.
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_common import REPO_DIR, percentiles, write_results
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WEB_DIR = os.path.join(REPO_DIR, "scoreboard_web")
+
+# Runs server.py's production server, like "python server.py"
+SERVE = (
+    "import sys; sys.path.insert(0, sys.argv[1]); import server; "
+    "server.serve('127.0.0.1', int(sys.argv[2]))"
+)
+
+# Mode per page
+MODE_PAGES = {
+    "/": "index",
+    "/scores_and_teams": "scores_and_teams",
+    "/stopwatch": "stopwatch",
+    "/timer": "timer",
+    "/message": "message",
+}
+TIMER_DURATIONS = (300, 600, 900)
+TOGGLES = {"stopwatch": "/stopwatch/toggle", "game": "/game_clock/toggle"}
+
+# (kind, weight)
+MIX = [
+    ("score", 30),
+    ("get_state", 25),
+    ("mode", 10),
+    ("stopwatch_toggle", 8),
+    ("game_toggle", 8),
+    ("timer_update", 8),
+]
+
+# Attempts per request after connection errors. Only reads and score
+# changes (they keep their idempotency key) are retried; a toggle that
+# might have been applied cannot be sent again.
+ATTEMPTS = 3
+
+
+# --- Reader (headless display) ---
+def check_state(state, last, problems):
+    # Appends what is wrong with 'state' (compared to 'last') to problems
+    teams = state.get("teams")
+    if not isinstance(teams, list) or len(teams) != 2:
+        problems.append(f"v{state.get('version')}: teams malformed: {teams!r}")
+        return
+    if not isinstance(state.get("clocks"), dict):
+        problems.append(f"v{state.get('version')}: clocks missing")
+    if last is None:
+        return
+    if state.get("version", 0) < last.get("version", 0):
+        problems.append(f"version went back from {last.get('version')} to {state.get('version')}")
+    for i, (team, old) in enumerate(zip(teams, last["teams"])):
+        if team.get("score", 0) < old.get("score", 0):
+            problems.append(
+                f"v{state.get('version')}: score of team {i} went back "
+                f"from {old.get('score')} to {team.get('score')}"
+            )
+
+
+def run_reader(state_file):
+    sys.path.insert(0, os.path.join(REPO_DIR, "scoreboard"))
+    sys.path.insert(0, os.path.join(REPO_DIR, "shared"))
+    from state_channel import StateSubscriber
+    from state_file import read_state
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    subscriber = StateSubscriber(os.path.join(os.path.dirname(state_file), "state.sock"))
+    stats = {"states": 0, "file_reads": 0, "torn_reads": 0, "reconnects": 0}
+    problems = []
+    last = None
+    last_file = None
+    next_file_read = 0.0
+
+    while not stop.is_set():
+        if not subscriber.connected:
+            if subscriber.connect():
+                stats["reconnects"] += 1
+            else:
+                time.sleep(0.05)
+                continue
+
+        subscriber.wait(0.02)
+        try:
+            state, changed = subscriber.poll()
+        except ValueError:
+            # A message that is not valid JSON: torn on the wire
+            stats["torn_reads"] += 1
+            subscriber.close()
+            continue
+        if changed and state is not None:
+            stats["states"] += 1
+            check_state(state, last, problems)
+            last = state
+
+        # The file too, as the display reads it when the server is away
+        now = time.monotonic()
+        if now >= next_file_read:
+            next_file_read = now + 0.05
+            file_state = read_state(state_file)
+            stats["file_reads"] += 1
+            if file_state is None:
+                if os.path.exists(state_file):
+                    stats["torn_reads"] += 1
+            else:
+                check_state(file_state, last_file, problems)
+                last_file = file_state
+
+    subscriber.close()
+    stats["problems"] = problems[:20]
+    stats["problem_count"] = len(problems)
+    stats["last_state"] = last
+    json.dump(stats, sys.stdout)
+
+
+# --- Load ---
+class Client:
+    # One operator: a keep-alive HTTP connection, sequential requests
+
+    def __init__(self, port, client_id, seed, totals):
+        self.port = port
+        self.id = client_id
+        self.rng = random.Random(seed)
+        self.totals = totals
+        self.samples = {kind: [] for kind, _ in MIX}
+        self.errors = []
+        self.last_version = 0
+        self.requests = 0
+        self._conn = None
+
+    def _request(self, method, path, body=None):
+        payload = None if body is None else json.dumps(body)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        attempts = ATTEMPTS if method == "GET" or "key" in (body or {}) else 1
+        for attempt in range(attempts):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+            try:
+                self._conn.request(method, path, payload, headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                return response.status, data
+            except (OSError, http.client.HTTPException):
+                self._conn.close()
+                self._conn = None
+                if attempt == attempts - 1:
+                    raise
+
+    def step(self, count):
+        kinds, weights = zip(*MIX)
+        for i in range(count):
+            kind = self.rng.choices(kinds, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                ok = getattr(self, "_" + kind)(i)
+            except (OSError, http.client.HTTPException) as e:
+                self.errors.append(f"{kind}: {e}")
+                continue
+            self.samples[kind].append((time.perf_counter() - t0) * 1000)
+            self.requests += 1
+            if not ok:
+                self.errors.append(f"{kind}: unexpected response")
+        if self._conn is not None:
+            self._conn.close()
+
+    def _score(self, i):
+        team = self.rng.randrange(2)
+        delta = self.rng.choice((1, 2, 3))
+        body = {"key": f"{self.id}-{i}", "ops": [{"op": "score", "team": team, "delta": delta}]}
+        status, data = self._request("POST", "/ops", body)
+        if status != 200 or json.loads(data).get("status") not in ("ok", "duplicate"):
+            return False
+        self.totals.add(("score", team), delta)
+        return True
+
+    def _get_state(self, i):
+        status, data = self._request("GET", "/get_state")
+        if status != 200:
+            return False
+        state = json.loads(data)
+        problems = []
+        check_state(state, None, problems)
+        # Requests of one client are sequential: never an older state
+        if state.get("version", 0) < self.last_version:
+            problems.append("older state than before")
+        self.last_version = state.get("version", 0)
+        self.errors.extend(problems)
+        return not problems
+
+    def _mode(self, i):
+        path = self.rng.choice(list(MODE_PAGES))
+        status, _ = self._request("GET", path)
+        return status == 200
+
+    def _toggle(self, clock):
+        status, _ = self._request("POST", TOGGLES[clock])
+        if not 200 <= status < 300:
+            return False
+        self.totals.add(("toggle", clock), 1)
+        return True
+
+    def _stopwatch_toggle(self, i):
+        return self._toggle("stopwatch")
+
+    def _game_toggle(self, i):
+        return self._toggle("game")
+
+    def _timer_update(self, i):
+        body = {"duration": self.rng.choice(TIMER_DURATIONS), "running": False}
+        status, _ = self._request("POST", "/timer/update", body)
+        return 200 <= status < 300
+
+
+class Totals:
+    # Expected effects of all successful requests
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {}
+
+    def add(self, key, amount):
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, key):
+        return self.values.get(key, 0)
+
+
+# --- Checks ---
+def verify(name, state, totals, checks):
+    # Compares 'state' with the expected totals; adds one check per value
+    if state is None:
+        checks[f"{name}.present"] = {"ok": False}
+        return
+    teams = state.get("teams", [{}, {}])
+    for i in range(2):
+        expected = totals.get(("score", i))
+        actual = teams[i].get("score") if i < len(teams) else None
+        checks[f"{name}.score{i}"] = {"ok": actual == expected, "expected": expected, "actual": actual}
+    for clock in TOGGLES:
+        expected = totals.get(("toggle", clock)) % 2 == 1
+        actual = state.get("clocks", {}).get(clock, {}).get("running")
+        checks[f"{name}.{clock}_running"] = {"ok": actual == expected, "expected": expected, "actual": actual}
+    duration = state.get("clocks", {}).get("timer", {}).get("duration")
+    checks[f"{name}.timer"] = {"ok": duration in TIMER_DURATIONS + (0, 0.0), "actual": duration}
+    mode = state.get("mode")
+    checks[f"{name}.mode"] = {"ok": mode in MODE_PAGES.values(), "actual": mode}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server(port, process, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/get_state")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent soak test for the server")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000, help="total requests")
+    parser.add_argument("--persistence", choices=("log", "snapshot"), default="log")
+    parser.add_argument("--fsync", choices=("always", "durable", "never"), default="durable")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reader", metavar="STATE_FILE", help=argparse.SUPPRESS)
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    if args.reader:
+        run_reader(args.reader)
+        return
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        state_file = os.path.join(state_dir, "state.json")
+        port = free_port()
+        env = dict(
+            os.environ,
+            SCOREBOARD_STATE_FILE=state_file,
+            SCOREBOARD_PERSISTENCE=args.persistence,
+            SCOREBOARD_FSYNC=args.fsync,
+            CEC_CLIENT=f"{sys.executable} {os.path.join(BENCH_DIR, 'fake_cec_client.py')}",
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-c", SERVE, WEB_DIR, str(port)], env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        reader = None
+        try:
+            wait_for_server(port, server)
+            reader = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--reader", state_file],
+                stdout=subprocess.PIPE, text=True,
+            )
+
+            totals = Totals()
+            clients = [Client(port, i, args.seed * 1000 + i, totals) for i in range(args.clients)]
+            threads = [
+                threading.Thread(target=client.step, args=(args.requests // args.clients,))
+                for client in clients
+            ]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - t0
+
+            checks = {}
+            status, data = Client(port, "final", 0, totals)._request("GET", "/get_state")
+            verify("server", json.loads(data) if status == 200 else None, totals, checks)
+
+            # Let the reader catch up, then stop it and the server
+            time.sleep(1.0)
+            reader.send_signal(signal.SIGTERM)
+            reader_stats = json.loads(reader.communicate(timeout=10)[0])
+            verify("reader", reader_stats.pop("last_state"), totals, checks)
+
+            server.send_signal(signal.SIGINT)
+            server.wait(timeout=30)
+            with open(state_file) as f:
+                verify("file", json.load(f), totals, checks)
+        finally:
+            for process in (server, reader):
+                if process is not None and process.poll() is None:
+                    process.kill()
+
+    samples = {kind: [] for kind, _ in MIX}
+    errors = []
+    for client in clients:
+        for kind, values in client.samples.items():
+            samples[kind].extend(values)
+        errors.extend(client.errors)
+    all_samples = [value for values in samples.values() for value in values]
+
+    checks["reader.no_torn_reads"] = {"ok": reader_stats["torn_reads"] == 0, "actual": reader_stats["torn_reads"]}
+    checks["reader.no_problems"] = {"ok": reader_stats["problem_count"] == 0, "actual": reader_stats["problems"]}
+    checks["clients.no_errors"] = {"ok": not errors, "actual": errors[:20]}
+    failed = sorted(name for name, check in checks.items() if not check["ok"])
+
+    write_results("soak", {
+        "clients": args.clients,
+        "persistence": args.persistence,
+        "fsync": args.fsync,
+        "requests": len(all_samples),
+        "seconds": elapsed,
+        "requests_per_second": len(all_samples) / elapsed if elapsed else 0.0,
+        "overall": percentiles(all_samples),
+        "kinds": {kind: percentiles(values) for kind, values in samples.items()},
+        "reader": reader_stats,
+        "checks": checks,
+        "failed": failed,
+    }, args.output)
+
+    if failed:
+        print(f"FAILED: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Race check for claiming tournament matches (POST /tournament/next).
+#
+#   python bench/tournament_race.py [--clients 8] [--rounds 20] [-o out.json]
+#
+# Two boards, each with several clients that request the next match at
+# the same moment (a barrier releases them together), round after round.
+# Per board and round exactly one request may win; the others must get
+# 409. The winner's match must be the only live match of the board and
+# the one in the board's state, so it can be finished. Every round ends
+# by finishing both matches. Exits with 1 if a check fails.
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from bench_common import REPO_DIR, write_results
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Boards besides the default one
+EXTRA_BOARDS = ("court2",)
+
+
+def load_server(state_dir):
+    # Import server.py against a temporary state directory (the tournament
+    # database lives next to the state file) and a fake cec-client
+    os.environ["SCOREBOARD_STATE_FILE"] = os.path.join(state_dir, "state.json")
+    os.environ["SCOREBOARD_BOARDS"] = ",".join(EXTRA_BOARDS)
+    os.environ["CEC_CLIENT"] = f"{sys.executable} {os.path.join(BENCH_DIR, 'fake_cec_client.py')}"
+    sys.path.insert(0, os.path.join(REPO_DIR, "scoreboard_web"))
+    import server
+    return server
+
+
+def claim_round(app, prefix, clients):
+    # All clients request the next match at once; returns the status codes
+    barrier = threading.Barrier(clients)
+    statuses = []
+    lock = threading.Lock()
+
+    def client():
+        test_client = app.test_client()
+        barrier.wait()
+        status = test_client.post(prefix + "/tournament/next").status_code
+        with lock:
+            statuses.append(status)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tournament match claiming race check")
+    parser.add_argument("--clients", type=int, default=8, help="simultaneous requests per board")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    problems = []
+    with tempfile.TemporaryDirectory() as state_dir:
+        server = load_server(state_dir)
+        client = server.app.test_client()
+        boards = {board_id: server.boards.get(board_id).url_prefix for board_id in server.boards.ids()}
+
+        team_ids = [
+            client.post("/tournament/teams", json={"name": name}).get_json()["team"]["id"]
+            for name in ("Team A", "Team B")
+        ]
+        for _ in range(args.rounds * len(boards)):
+            client.post("/tournament/matches", json={"teams": team_ids})
+
+        t0 = time.perf_counter()
+        for round_number in range(args.rounds):
+            results = {}
+            threads = []
+            for board, prefix in boards.items():
+                def run(board=board, prefix=prefix):
+                    results[board] = claim_round(server.app, prefix, args.clients)
+                threads.append(threading.Thread(target=run))
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            for board, prefix in boards.items():
+                statuses = results[board]
+                won = statuses.count(200)
+                if won != 1 or statuses.count(409) != len(statuses) - 1:
+                    problems.append(f"round {round_number}, {board}: statuses {sorted(statuses)}")
+
+                live = [m for m in server.tournament.matches("live") if m["board"] == board]
+                match = server.boards.get(board).store.snapshot().get("match")
+                if len(live) != 1 or match is None or live[0]["id"] != match["id"]:
+                    problems.append(
+                        f"round {round_number}, {board}: live {[m['id'] for m in live]}, "
+                        f"state {match}"
+                    )
+
+                if client.post(prefix + "/tournament/finish").status_code != 200:
+                    problems.append(f"round {round_number}, {board}: finish failed")
+        elapsed = time.perf_counter() - t0
+
+        left_live = len(server.tournament.matches("live"))
+        finished = len(server.tournament.matches("finished"))
+        server.boards.close()
+        server.tournament.close()
+        server.cec.close()
+
+    if left_live:
+        problems.append(f"{left_live} matches still live at the end")
+    if finished != args.rounds * len(boards):
+        problems.append(f"{finished} matches finished, expected {args.rounds * len(boards)}")
+
+    write_results("tournament_race", {
+        "boards": len(boards),
+        "clients": args.clients,
+        "rounds": args.rounds,
+        "seconds": elapsed,
+        "finished": finished,
+        "problems": problems,
+    }, args.output)
+
+    if problems:
+        print(f"FAILED: {len(problems)} problems", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import functools
+import json
+import os
+
+import pygame
+
+# pygame.font.SysFont() scans every installed font (fc-list) the first
+# time it is used, which takes seconds on the Pi. The font file a name
+# resolves to is kept in this file across restarts, so a normal start
+# never scans. Delete it after installing or removing fonts.
+FONT_CACHE_FILE = os.environ.get(
+    "SCOREBOARD_FONT_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "scoreboard", "fonts.json")
+)
+
+_font_paths = None
+
+
+def _load_font_paths():
+    try:
+        with open(FONT_CACHE_FILE, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_font_paths(paths):
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_FILE), exist_ok=True)
+        tmp_path = f"{FONT_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(paths, f)
+        os.replace(tmp_path, FONT_CACHE_FILE)
+    except OSError:
+        pass  # Read-only home: scan again next time
+
+
+def resolve_font(name):
+    # Font file for a system font name, or None for pygame's default font
+    # (what SysFont falls back to as well)
+    global _font_paths
+    if _font_paths is None:
+        _font_paths = _load_font_paths()
+
+    if name in _font_paths:
+        path = _font_paths[name]
+        if path is None or os.path.exists(path):
+            return path
+
+    path = pygame.font.match_font(name)
+    _font_paths[name] = path
+    _save_font_paths(_font_paths)
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(name, size):
+    # Font objects are expensive to create, so keep one per (name, size).
+    # They are only created when first drawn with.
+    return pygame.font.Font(resolve_font(name), size)
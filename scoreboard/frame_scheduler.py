@@ -0,0 +1,73 @@
+import time
+
+import pygame
+
+# Longest time the idle wait goes without looking at pygame events
+EVENT_POLL_INTERVAL = 0.05
+
+# Wake up slightly after a second boundary so the new second is visible
+BOUNDARY_SLACK = 0.005
+
+
+def _until_next_second(seconds):
+    return 1.0 - (seconds % 1.0) + BOUNDARY_SLACK
+
+
+def needs_full_rate(state, clocks):
+    # True while a centisecond counter is visibly running or the ticker
+    # scrolls
+    mode = state.get("mode", "index")
+
+    if mode in ("stopwatch", "timer"):
+        return clocks[mode]["running"]
+
+    if mode == "ticker":
+        return clocks["ticker"]["running"] and (state.get("ticker") or {}).get("speed", 1) > 0
+
+    return False
+
+
+def idle_delay(state, clocks, now):
+    # Seconds until the next visible change when nothing runs at full
+    # rate: the wall clock and (in scores mode) the running game clock
+    # only change once a second.
+    delay = _until_next_second(now)
+
+    if state.get("mode") == "scores_and_teams" and clocks["game"]["running"]:
+        delay = min(delay, _until_next_second(clocks["game"]["elapsed"]))
+
+    return delay
+
+
+class FrameScheduler:
+    # Derives the frame rate from the current state: max_fps while a
+    # centisecond counter is running, otherwise sleep until the next
+    # second boundary. The idle wait returns early as soon as the state
+    # file changes or pygame has pending events (e.g. QUIT). Deadlines
+    # are monotonic, so a wall clock step (NTP) cannot stall the loop.
+
+    def __init__(self, max_fps=60):
+        self.max_fps = max_fps
+        self.clock = pygame.time.Clock()
+
+    def wait(self, states, clocks, instant, watcher):
+        # 'states': the state every output showed in the frame just drawn
+        # (outputs can show different modes); 'clocks' and 'instant' are
+        # those of that frame
+        if any(needs_full_rate(state, clocks) for state in states):
+            self.clock.tick(self.max_fps)
+            return
+
+        delay = min(idle_delay(state, clocks, instant.wall) for state in states)
+        deadline = instant.mono + delay
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if watcher.wait(min(remaining, EVENT_POLL_INTERVAL)):
+                break
+            if pygame.event.peek():
+                break
+
+        # Keep the clock in sync so the next fast frame is not rushed
+        self.clock.tick()
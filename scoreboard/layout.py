@@ -0,0 +1,108 @@
+import functools
+
+import pygame
+
+from fonts import get_font
+
+FONT_NAME = "Arial"
+
+# The design resolution: every size below is in pixels at 1920x1080 and
+# scaled for other outputs (e.g. a small referee monitor)
+BASE_WIDTH = 1920
+BASE_HEIGHT = 1080
+
+# Font sizes at the design resolution
+FONT_SIZES = {
+    "digits": 180,       # stopwatch / timer
+    "team": 140,
+    "score": 350,
+    "clock_small": 100,
+    "clock_large": 300,
+    "date_small": 100,
+    "game_time": 140,
+    "debug": 28,
+    "ticker": 180,
+    "message_max": 180,
+    "message_min": 50,
+}
+
+# Height of the ticker band (fraction of the screen height)
+TICKER_BAND_HEIGHT = 0.3
+
+
+def _centered(width, height, box_width, box_height):
+    return pygame.Rect(
+        (width - box_width) / 2, (height - box_height) / 2, box_width, box_height
+    )
+
+
+class Layout:
+    # Geometry of all modes for one output resolution. It is computed
+    # once per resolution (see get_layout) instead of on every frame, and
+    # shared by all renderers of that size.
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.scale = min(width / BASE_WIDTH, height / BASE_HEIGHT)
+        self.fonts = {name: self.px(size) for name, size in FONT_SIZES.items()}
+
+        # Distance of the date / small clock to the screen edges
+        self.margin = self.px(10)
+        self.radius = self.px(40)
+
+        # --- Stopwatch / timer ---
+        self.center_box = _centered(width, height, width * 0.7, height * 0.4)
+
+        # --- Message ---
+        # The box starts at the base size and grows with the text up to
+        # the maximum (below the clock and date)
+        self.message_padding = self.px(40)
+        self.message_base = (int(width * 0.7), int(height * 0.4))
+        self.message_max = (int(width * 0.9), height - self.px(160) - self.px(60))
+
+        # --- Ticker ---
+        band_height = int(height * TICKER_BAND_HEIGHT)
+        band = pygame.Rect(0, (height - band_height) // 2, width, band_height)
+        band.inflate_ip(-int(width * 0.05), 0)
+        self.ticker_band = band
+        self.ticker_area = band.inflate(-2 * self.radius, 0)
+
+    def px(self, size):
+        # A size at the design resolution, scaled to this output
+        return max(1, round(size * self.scale))
+
+    def font(self, name):
+        return get_font(FONT_NAME, self.fonts[name])
+
+    @functools.cached_property
+    def scores(self):
+        # Team cards side by side, the game time below them. Computed on
+        # first use because it depends on the height of the game time font.
+        top_margin = self.px(120)     # Distance from top
+        spacing = self.px(40)         # Horizontal spacing between team boxes
+        time_margin = self.px(20)     # Space between boxes and game time
+        bottom_margin = time_margin   # Distance from time to bottom same as time_margin
+
+        card_width = self.width // 2 - spacing * 1.5
+        card_height = (
+            self.height
+            - top_margin
+            - self.font("game_time").get_height()
+            - time_margin
+            - bottom_margin
+        )
+        cards = [
+            pygame.Rect(spacing + i * (card_width + spacing), top_margin, card_width, card_height)
+            for i in range(2)
+        ]
+        return {
+            "cards": cards,
+            "name_offset": self.px(20),
+            "time_top": top_margin + card_height + time_margin,
+        }
+
+
+@functools.lru_cache(maxsize=8)
+def get_layout(width, height):
+    return Layout(width, height)
@@ -0,0 +1,74 @@
+import re
+
+import pygame
+from pygame._sdl2 import video
+
+# --output WxH[+X+Y][:MODE]   e.g. 800x480+1920+0:scores_and_teams
+#        full+X+Y[:MODE]      fullscreen on the monitor at X,Y
+OUTPUT_PATTERN = re.compile(r"^(?:(\d+)x(\d+)|full)(?:\+(-?\d+)\+(-?\d+))?(?::([a-z_]+))?$")
+
+
+def parse_output(text):
+    # Returns (size or None for fullscreen, position or None, mode or None)
+    match = OUTPUT_PATTERN.match(text.strip().lower())
+    if match is None:
+        raise ValueError(f"invalid output {text!r}, expected WxH[+X+Y][:MODE]")
+    width, height, x, y, mode = match.groups()
+    size = (int(width), int(height)) if width else None
+    position = (int(x), int(y)) if x is not None else None
+    return size, position, mode
+
+
+class DisplayOutput:
+    # The pygame.display window (the main screen)
+
+    def __init__(self, surface, mode=None):
+        self.surface = surface
+        self.size = surface.get_size()
+        # Mode shown on this output; None follows the state
+        self.mode = mode
+        self.renderer = None
+
+    def shown_state(self, state):
+        return state if self.mode is None else dict(state, mode=self.mode)
+
+    def present(self, dirty):
+        pygame.display.update(dirty)
+
+    def close(self):
+        pass
+
+
+class WindowOutput(DisplayOutput):
+    # An additional window through SDL2's multi-window API
+    # (pygame._sdl2.video); pygame.display only manages one window. Frames
+    # are drawn into an offscreen surface like on the main screen, the
+    # changed regions are uploaded into a streaming texture and the
+    # texture is presented.
+
+    def __init__(self, size, position=None, mode=None, title="Scoreboard"):
+        options = {"borderless": position is not None}
+        if size is None:
+            options["fullscreen_desktop"] = True
+        self.window = video.Window(
+            title, size or video.Window.DEFAULT_SIZE,
+            position=position if position is not None else video.WINDOWPOS_UNDEFINED,
+            **options
+        )
+        self.sdl_renderer = video.Renderer(self.window)
+        size = self.window.size
+        self.texture = video.Texture(self.sdl_renderer, size, streaming=True)
+        super().__init__(pygame.Surface(size), mode)
+
+    def present(self, dirty):
+        bounds = self.surface.get_rect()
+        for rect in dirty:
+            rect = rect.clip(bounds)
+            if rect.width and rect.height:
+                self.texture.update(self.surface.subsurface(rect), rect)
+        self.sdl_renderer.clear()
+        self.texture.draw()
+        self.sdl_renderer.present()
+
+    def close(self):
+        self.window.destroy()
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+import pygame
+
+# Characters pre-rendered for clock strings like "HH:MM:SS.cc"
+CLOCK_GLYPHS = "0123456789:.-"
+
+
+class TextCache:
+    # LRU cache of rendered text surfaces keyed by (font, text, color).
+    # Team names, scores, the date and message lines only change every
+    # few seconds/minutes, so most frames are pure cache hits.
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._surfaces = OrderedDict()
+        self._atlases = {}
+
+    def render(self, font, text, color):
+        key = (font, text, tuple(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+
+        surface = font.render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def atlas(self, font, color):
+        key = (font, tuple(color))
+        atlas = self._atlases.get(key)
+        if atlas is None:
+            atlas = DigitAtlas(font, color)
+            self._atlases[key] = atlas
+        return atlas
+
+    def render_clock(self, font, text, color):
+        # Clock strings are built from pre-rendered digit glyphs; anything
+        # else falls back to the normal (cached) text rendering.
+        atlas = self.atlas(font, color)
+        if atlas.supports(text):
+            return atlas.render(text)
+        return self.render(font, text, color)
+
+    def clear(self):
+        self._surfaces.clear()
+        self._atlases.clear()
+
+
+class DigitAtlas:
+    # Pre-rendered glyph surfaces for one (font, color). Clock strings are
+    # composed by blitting the glyphs next to each other instead of
+    # running a FreeType rasterization on every frame.
+
+    def __init__(self, font, color, chars=CLOCK_GLYPHS):
+        self.height = font.get_height()
+        self.glyphs = {ch: font.render(ch, True, color) for ch in chars}
+        self.widths = {ch: glyph.get_width() for ch, glyph in self.glyphs.items()}
+        self._last_text = None
+        self._last_surface = None
+
+    def supports(self, text):
+        return all(ch in self.glyphs for ch in text)
+
+    def size(self, text):
+        return sum(self.widths[ch] for ch in text), self.height
+
+    def blit(self, target, text, pos, special_flags=0):
+        x, y = pos
+        for ch in text:
+            target.blit(self.glyphs[ch], (x, y), special_flags=special_flags)
+            x += self.widths[ch]
+
+    def render(self, text):
+        # The wall clock only changes once a second, so keep the last string
+        if text == self._last_text:
+            return self._last_surface
+
+        # Glyphs never overlap, so copying them with RGBA_MAX onto a fully
+        # transparent surface keeps their exact colors and alpha.
+        surface = pygame.Surface(self.size(text), pygame.SRCALPHA)
+        self.blit(surface, text, (0, 0), pygame.BLEND_RGBA_MAX)
+        self._last_text = text
+        self._last_surface = surface
+        return surface
@@ -0,0 +1,432 @@
+import datetime
+import time
+from zoneinfo import ZoneInfo
+
+import pygame
+
+from layout import FONT_NAME, get_layout
+from render_cache import TextCache
+from text_layout import get_fitting_font
+
+GERMAN_WEEKDAYS = {
+    0: "Montag",
+    1: "Dienstag",
+    2: "Mittwoch",
+    3: "Donnerstag",
+    4: "Freitag",
+    5: "Samstag",
+    6: "Sonntag",
+}
+
+TIMEZONE = ZoneInfo("Europe/Vienna")
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+BOX_COLOR = (91, 124, 255)
+TRANSPARENT = (0, 0, 0, 0)
+
+# Ticker scroll speed in pixels per second at 1920x1080, if the state
+# has none
+TICKER_SPEED = 240
+
+
+def format_hms(ms):
+    total = ms // 1000
+    h = total // 3600
+    m = (total % 3600) // 60
+    s = total % 60
+    return f"{h:02}:{m:02}:{s:02}"
+
+
+def _font(name):
+    # Font attribute (scaled to the output) that is only loaded when first
+    # drawn with, so the first frame does not wait for fonts it does not show
+    return property(lambda self: self.layout.font(name))
+
+
+class Renderer:
+    # Draws the scoreboard onto a surface.
+    #
+    # Everything that only changes with the state (white background, boxes,
+    # team cards, message text) is drawn once into an offscreen background
+    # surface. The parts that change on their own (date, wall clock,
+    # stopwatch/timer digits, scores, game clock) are "widgets": each frame
+    # only the widgets whose text changed are restored from the background
+    # and drawn again, and only their rectangles are reported as dirty.
+    #
+    # Sizes and positions come from the Layout of the output resolution
+    # (layout.py). Renderers of several outputs can share one TextCache,
+    # so outputs of the same size share their rendered text and glyphs.
+
+    # --- Fonts ---
+    font = _font("digits")
+    team_font = _font("team")
+    score_font = _font("score")
+    clock_font_small = _font("clock_small")
+    clock_font_large = _font("clock_large")
+    date_font_small = _font("date_small")
+    game_time_font = _font("game_time")
+    debug_font = _font("debug")
+    ticker_font = _font("ticker")
+
+    def __init__(self, width, height, text_cache=None, transparent=False):
+        # transparent=True leaves out the white background (for overlays);
+        # the target surface must then have per-pixel alpha as well
+        self.width = width
+        self.height = height
+        self.layout = get_layout(width, height)
+        self.text_cache = text_cache or TextCache()
+        self.transparent = transparent
+
+        flags = pygame.SRCALPHA if transparent else 0
+        self.background = pygame.Surface((width, height), flags)
+        self._background_key = None
+        self._widgets = {}
+        # Pre-rendered strip of the ticker message that is scrolling
+        self._ticker_widths = None
+        self._ticker_strip = None
+
+        # Optional instrumentation: a histogram with a "phase" label
+        # (layout/render), and text lines for the debug overlay
+        self.phase_seconds = None
+        self.overlay_lines = None
+
+    def invalidate(self):
+        # Forces a full redraw on the next frame
+        self._background_key = None
+
+    # --- Frame ---
+    def draw(self, surface, state, now, clocks, full=False):
+        # Draws one frame for 'state' at wall time 'now' (time.time()),
+        # with 'clocks' = read_clocks(state, ...) for the same instant.
+        # Returns the list of rectangles that changed on 'surface'.
+        timing = self.phase_seconds is not None
+        if timing:
+            start = time.perf_counter()
+
+        mode = state.get("mode", "index")
+
+        key = self._background_layout_key(mode, state)
+        if key != self._background_key:
+            self._background_key = key
+            self._draw_background(mode, state)
+            full = True
+
+        widgets = self._frame_widgets(mode, state, now, clocks)
+        if self.overlay_lines:
+            widgets["debug_overlay"] = self._overlay_widget(self.overlay_lines)
+
+        if timing:
+            layout_done = time.perf_counter()
+            self.phase_seconds.labels("layout").observe(layout_done - start)
+
+        dirty = self._blit_widgets(surface, widgets, full)
+
+        if timing:
+            self.phase_seconds.labels("render").observe(time.perf_counter() - layout_done)
+        return dirty
+
+    def _blit_widgets(self, surface, widgets, full):
+        if full:
+            self._restore(surface, surface.get_rect())
+            for text, rect, draw in widgets.values():
+                draw(surface)
+            self._widgets = widgets
+            return [surface.get_rect()]
+
+        dirty = []
+        for name, (text, rect, draw) in widgets.items():
+            old = self._widgets.get(name)
+            if old is not None and old[0] == text and old[1] == rect:
+                continue
+            area = rect.union(old[1]) if old is not None else rect
+            self._restore(surface, area)
+            draw(surface)
+            dirty.append(area)
+
+        # Widgets that disappeared since the last frame
+        for name, (text, rect, draw) in self._widgets.items():
+            if name not in widgets:
+                self._restore(surface, rect)
+                dirty.append(rect)
+
+        self._widgets = widgets
+        return dirty
+
+    def _restore(self, surface, area):
+        # Copies the background into 'area'. Blitting alpha onto alpha
+        # blends, so a transparent target is cleared first.
+        if self.transparent:
+            surface.fill(TRANSPARENT, area)
+        surface.blit(self.background, area, area)
+
+    # --- Widgets ---
+    def _surface_widget(self, text, text_surface, pos):
+        rect = text_surface.get_rect(topleft=pos)
+        return text, rect, lambda target: target.blit(text_surface, rect)
+
+    def _clock_widget(self, text, font, color, center):
+        # Digits are blitted glyph by glyph from the atlas
+        atlas = self.text_cache.atlas(font, color)
+        if not atlas.supports(text):
+            text_surface = self.text_cache.render(font, text, color)
+            return self._surface_widget(
+                text, text_surface, text_surface.get_rect(center=center).topleft
+            )
+        w, h = atlas.size(text)
+        rect = pygame.Rect(center[0] - w // 2, center[1] - h // 2, w, h)
+        return text, rect, lambda target: atlas.blit(target, text, rect.topleft)
+
+    def _overlay_widget(self, lines):
+        # Debug overlay in the bottom-left corner, on a black panel
+        text = "\n".join(lines)
+        line_height = self.debug_font.get_linesize()
+        margin = self.layout.margin
+        width = max(self.debug_font.size(line)[0] for line in lines) + 2 * margin
+        height = line_height * len(lines) + margin
+        rect = pygame.Rect(margin, self.height - height - margin, width, height)
+
+        def draw(target):
+            target.fill(BLACK, rect)
+            y = rect.y + margin // 2
+            for line in lines:
+                target.blit(self.debug_font.render(line, True, WHITE), (rect.x + margin, y))
+                y += line_height
+
+        return text, rect, draw
+
+    def _frame_widgets(self, mode, state, now, clocks):
+        WIDTH, HEIGHT = self.width, self.height
+        margin = self.layout.margin
+        widgets = {}
+
+        # --- Current time and date ---
+        local = datetime.datetime.fromtimestamp(now, TIMEZONE)
+        weekday = GERMAN_WEEKDAYS[local.weekday()]
+        now_time = f"{local.hour:02}:{local.minute:02}:{local.second:02}"
+        date_text = f"{weekday}, {local.day:02}.{local.month:02}.{local.year}"
+
+        # Always display date at the top-right
+        date_surface = self.text_cache.render(self.date_font_small, date_text, BLACK)
+        widgets["date"] = self._surface_widget(
+            date_text, date_surface, (WIDTH - date_surface.get_width() - margin, margin)
+        )
+
+        if mode == "index":
+            # Large centered time display
+            time_surface = self.text_cache.render_clock(self.clock_font_large, now_time, BLACK)
+            widgets["clock"] = self._surface_widget(
+                now_time, time_surface,
+                ((WIDTH - time_surface.get_width()) // 2,
+                (HEIGHT - time_surface.get_height()) // 2)
+            )
+        else:
+            # Small time display at the top-left
+            clock_surface = self.text_cache.render_clock(self.clock_font_small, now_time, BLACK)
+            widgets["clock"] = self._surface_widget(now_time, clock_surface, (margin, margin))
+
+        if mode == "stopwatch":
+            time_text = self._stopwatch_text(clocks["stopwatch"])
+            widgets["stopwatch"] = self._clock_widget(
+                time_text, self.font, WHITE, (WIDTH // 2, HEIGHT // 2)
+            )
+
+        elif mode == "timer":
+            time_text = self._timer_text(clocks["timer"])
+            widgets["timer"] = self._clock_widget(
+                time_text, self.font, WHITE, (WIDTH // 2, HEIGHT // 2)
+            )
+
+        elif mode == "scores_and_teams":
+            layout = self.layout.scores
+            teams = state.get("teams", [])
+            for i, team in enumerate(teams[:2]):
+                card = layout["cards"][i]
+                score = str(team.get("score", 0))
+
+                # Score centered in the box
+                score_surf = self.text_cache.render(self.score_font, score, WHITE)
+                widgets[f"score{i}"] = self._surface_widget(
+                    score, score_surf,
+                    (card.x + (card.width - score_surf.get_width()) // 2,
+                    card.y + (card.height - score_surf.get_height()) // 2)
+                )
+
+            # Game time below the boxes
+            time_text = format_hms(int(clocks["game"]["elapsed"] * 1000))
+            time_surf = self.text_cache.render_clock(self.game_time_font, time_text, BLACK)
+            widgets["game_clock"] = self._surface_widget(
+                time_text, time_surf,
+                ((WIDTH - time_surf.get_width()) // 2, layout["time_top"])
+            )
+
+        elif mode == "ticker":
+            widgets["ticker"] = self._ticker_widget(state, clocks["ticker"]["elapsed"])
+
+        return widgets
+
+    def _stopwatch_text(self, stopwatch):
+        total_elapsed = stopwatch["elapsed"]
+
+        hours = int(total_elapsed // 3600)
+        minutes = int((total_elapsed % 3600) // 60)
+        seconds = int(total_elapsed % 60)
+        milliseconds = int((total_elapsed - int(total_elapsed)) * 1000) // 10
+
+        return f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:02}"
+
+    def _timer_text(self, timer):
+        remaining = timer["remaining"]
+
+        minutes = int(remaining // 60)
+        seconds = int(remaining % 60)
+        centiseconds = int((remaining - int(remaining)) * 100)
+
+        return f"{minutes:02}:{seconds:02}.{centiseconds:02}"
+
+    # --- Ticker ---
+    def _ticker_messages(self, state):
+        ticker = state.get("ticker") or {}
+        messages = tuple(m for m in ticker.get("messages", []) if m.strip())
+        return messages or (state.get("message", "Nachricht"),)
+
+    def _ticker_widget(self, state, elapsed):
+        # Each message of the playlist enters at the right edge and scrolls
+        # until it has left on the left, then the next one follows. The
+        # position is derived from the ticker clock (not added up frame by
+        # frame), so it never drifts and the display and /render.png agree.
+        messages = self._ticker_messages(state)
+        speed = (state.get("ticker") or {}).get("speed", TICKER_SPEED) * self.layout.scale
+        area = self.layout.ticker_area
+
+        # Scroll distance per message (text width plus the visible area)
+        if self._ticker_widths is None or self._ticker_widths[0] != messages:
+            widths = [self.ticker_font.size(message)[0] + area.width for message in messages]
+            self._ticker_widths = (messages, widths)
+        widths = self._ticker_widths[1]
+
+        distance = (elapsed * speed) % sum(widths)
+        for index, width in enumerate(widths):
+            if distance < width:
+                break
+            distance -= width
+        shift = round(distance)
+
+        # The text is rendered once per message onto the band color (an
+        # 8 bit surface) and each frame blits the visible part of it
+        if self._ticker_strip is None or self._ticker_strip[0] != messages[index]:
+            strip = self.ticker_font.render(messages[index], True, WHITE, BOX_COLOR)
+            self._ticker_strip = (messages[index], strip)
+        strip = self._ticker_strip[1]
+
+        x = area.right - shift
+        source = pygame.Rect(max(0, area.x - x), 0, 0, strip.get_height())
+        source.width = max(0, min(strip.get_width(), area.right - x) - source.x)
+        pos = (max(x, area.x), area.y + (area.height - strip.get_height()) // 2)
+
+        text = (messages[index], shift)
+        return text, area, lambda target: target.blit(strip, pos, source)
+
+    # --- Background (static layers) ---
+    def _background_layout_key(self, mode, state):
+        if mode == "message":
+            return (mode, state.get("message", "Nachricht"))
+        if mode == "scores_and_teams":
+            teams = tuple(
+                (team.get("name", "Team"), tuple(team.get("color", [80, 80, 80])))
+                for team in state.get("teams", [])[:2]
+            )
+            return (mode, teams)
+        return (mode,)
+
+    def _draw_background(self, mode, state):
+        screen = self.background
+
+        # --- White background (nothing for overlays) ---
+        screen.fill(TRANSPARENT if self.transparent else WHITE)
+
+        if mode in ("stopwatch", "timer"):
+            # Blue box (same style as message)
+            self._draw_center_box(screen)
+        elif mode == "message":
+            self._draw_message(screen, state.get("message", "Nachricht"))
+        elif mode == "ticker":
+            pygame.draw.rect(screen, BOX_COLOR, self.layout.ticker_band, border_radius=self.layout.radius)
+        elif mode == "scores_and_teams":
+            self._draw_team_cards(screen, state.get("teams", []))
+
+    def _draw_center_box(self, screen):
+        pygame.draw.rect(screen, BOX_COLOR, self.layout.center_box, border_radius=self.layout.radius)
+
+    def _draw_message(self, screen, message_text):
+        WIDTH, HEIGHT = self.width, self.height
+        layout = self.layout
+        padding = layout.message_padding
+
+        # Box size without text, and the maximum (safe area)
+        base_box_width, base_box_height = layout.message_base
+        box_width = base_box_width
+        box_height = base_box_height
+        max_box_width, max_box_height = layout.message_max
+
+        # Get optimal font and wrapped lines
+        message_font, lines = get_fitting_font(
+            message_text, FONT_NAME,
+            max_box_width - 2 * padding,
+            max_box_height - 2 * padding,
+            layout.fonts["message_max"],
+            layout.fonts["message_min"]
+        )
+
+        # Text dimensions
+        line_height = message_font.get_height()
+        text_height = line_height * len(lines)
+        text_width = max((message_font.size(line)[0] for line in lines), default=0)
+
+        # Adjust box width if text is wider than base
+        if text_width + 2 * padding > base_box_width:
+            box_width = min(text_width + 2 * padding, max_box_width)
+
+        # Adjust box height **only if text is taller than base**
+        if text_height + 2 * padding > base_box_height:
+            box_height = min(text_height + 2 * padding, max_box_height)
+
+        # Center box horizontally and vertically like stopwatch
+        box_x = (WIDTH - box_width) // 2
+        box_y = (HEIGHT - box_height) // 2
+
+        # Draw box
+        rect = pygame.Rect(box_x, box_y, box_width, box_height)
+        pygame.draw.rect(screen, BOX_COLOR, rect, border_radius=layout.radius)
+
+        # Text vertical positioning
+        if text_height + 2 * padding >= box_height:
+            y_offset = box_y + padding  # start at top padding if text is too tall
+        else:
+            y_offset = box_y + (box_height - text_height) // 2  # center vertically
+
+        # Draw text lines
+        for line in lines:
+            line_surface = self.text_cache.render(message_font, line, WHITE)
+            x = box_x + (box_width - line_surface.get_width()) // 2
+            screen.blit(line_surface, (x, y_offset))
+            y_offset += line_height
+
+    def _draw_team_cards(self, screen, teams):
+        layout = self.layout.scores
+
+        for i, team in enumerate(teams[:2]):
+            card = layout["cards"][i]
+
+            color = team.get("color", [80, 80, 80])
+            name = team.get("name", "Team")
+
+            # Draw the box
+            pygame.draw.rect(screen, color, card, border_radius=self.layout.radius)
+
+            # Draw team name at top of box
+            name_surf = self.text_cache.render(self.team_font, name, WHITE)
+            screen.blit(
+                name_surf,
+                (card.x + (card.width - name_surf.get_width()) // 2, card.y + layout["name_offset"])
+            )
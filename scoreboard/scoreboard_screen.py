@@ -1,380 +1,283 @@
-import pygame
+import argparse
+import signal
 import sys
 import time
-import json
 import os
-import datetime
-from zoneinfo import ZoneInfo
-
-GERMAN_WEEKDAYS = {
-    0: "Montag",
-    1: "Dienstag",
-    2: "Mittwoch",
-    3: "Donnerstag",
-    4: "Freitag",
-    5: "Samstag",
-    6: "Sonntag",
-}
 
-pygame.init()
+# No banner on stdout (it may carry the video stream, see --video-output)
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+# Modules shared with the server (../shared)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared"))
+
+from clocks import current_instant, default_clocks, migrate_legacy_clocks, read_clocks
+from metrics import REGISTRY
+from state_channel import StateSubscriber
+from state_file import DEFAULT_BOARD, board_state_file, read_state
+from frame_scheduler import FrameScheduler
+from outputs import DisplayOutput, WindowOutput, parse_output
+from render_cache import TextCache
+from renderer import Renderer
+from state_watcher import ChannelStateWatcher, StateWatcher
+
+# --- Command line options ---
+parser = argparse.ArgumentParser(description="Scoreboard display")
+parser.add_argument(
+    "--full-redraw", action="store_true",
+    help="redraw and flip the whole screen every frame instead of only the changed regions"
+)
+parser.add_argument(
+    "--max-fps", type=int, default=60,
+    help="frame rate while a stopwatch/timer is running (default: 60)"
+)
+parser.add_argument(
+    "--debug-overlay", action="store_true",
+    help="show the frame rate and per-phase frame times on screen"
+)
+parser.add_argument(
+    "--size", metavar="WxH",
+    help="window size instead of fullscreen (with SDL_VIDEODRIVER=dummy: no window, e.g. stream only)"
+)
+parser.add_argument(
+    "--video-output", metavar="TARGET",
+    help="also encode the frames to H.264: a file, '-' (MPEG-TS on stdout), rtmp://... or udp://..."
+)
+parser.add_argument(
+    "--video-fps", type=int, default=30,
+    help="video frame rate (default: 30)"
+)
+parser.add_argument(
+    "--video-bitrate", type=int, default=4_000_000,
+    help="video bit rate in bit/s (default: 4000000)"
+)
+parser.add_argument(
+    "--video-size", metavar="WxH",
+    help="scale the video to this size (default: screen size)"
+)
+parser.add_argument(
+    "--video-on-change", action="store_true",
+    help="only encode frames that changed (variable frame rate)"
+)
+parser.add_argument(
+    "--output", action="append", default=[], metavar="WxH[+X+Y][:MODE]",
+    help="additional window, e.g. 800x480+1920+0:scores_and_teams for a referee monitor "
+         "('full+X+Y' for fullscreen on the monitor at X,Y; without MODE it follows the state)"
+)
+parser.add_argument(
+    "--board", default=DEFAULT_BOARD,
+    help=f"board (court) to show, see SCOREBOARD_BOARDS (default: {DEFAULT_BOARD})"
+)
+args = parser.parse_args()
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+started_at = time.perf_counter()
+
+# Only the subsystems the display uses; pygame.init() would also bring
+# up audio, joystick etc. and delay the first frame
+pygame.display.init()
+pygame.font.init()
 
 # --- Screensize ---
-info = pygame.display.Info()
-WIDTH, HEIGHT = info.current_w, info.current_h
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+if args.size:
+    WIDTH, HEIGHT = parse_size(args.size)
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+else:
+    info = pygame.display.Info()
+    WIDTH, HEIGHT = info.current_w, info.current_h
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
 pygame.display.set_caption("Scoreboard Uhr")
 
-# --- Fonts ---
-font = pygame.font.SysFont("Arial", 180)
-team_font = pygame.font.SysFont("Arial", 140)
-score_font = pygame.font.SysFont("Arial", 350)
-clock_font_small = pygame.font.SysFont("Arial", 100)
-clock_font_large = pygame.font.SysFont("Arial", 300)
-date_font_small   = pygame.font.SysFont("Arial", 100)
-game_time_font = pygame.font.SysFont("Arial", 140)
-
-clock = pygame.time.Clock()
-
-# --- Path to state.json ---
-STATE_FILE = "/home/lori/VWA/scoreboard_web/state.json"
-
-# --- State handling functions ---
-def save_state(state):
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f, indent=4)
-        f.flush()
-        os.fsync(f.fileno())
-
-def load_state():
-    if not os.path.exists(STATE_FILE):
-        save_state({
-            "stopwatch_running": False,
-            "elapsed_ms": 0,
-            "mode": "index",
-            "message": "Nachricht",
-            "teams": [
-                {"name": "Team 1", "score": 0, "color": [91, 124, 255]},
-                {"name": "Team 2", "score": 0, "color": [214, 76, 76]}
-            ],
-            "last_start_ts": None
-        })
+# SIGTERM/SIGINT (systemd stop, Ctrl+C) end the main loop like closing the
+# window, so everything below it (e.g. finishing the video file) runs
+def request_quit(signum, frame):
+    pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+signal.signal(signal.SIGTERM, request_quit)
+signal.signal(signal.SIGINT, request_quit)
+
+# --- Frame scheduler (full rate only while centiseconds are running) ---
+scheduler = FrameScheduler(args.max_fps)
+
+# --- Video output (optional, needs PyAV) ---
+# Frames are handed to an encoder thread; when it falls behind, frames
+# are dropped instead of slowing down the display.
+video = None
+if args.video_output:
+    from video_output import VideoEncoder
+    video = VideoEncoder(
+        args.video_output, WIDTH, HEIGHT,
+        fps=args.video_fps, bitrate=args.video_bitrate,
+        size=parse_size(args.video_size) if args.video_size else None,
+        on_change=args.video_on_change,
+    )
+
+# --- Outputs ---
+# The main screen plus any --output windows. Every output has its own
+# renderer; they share one text cache, so outputs of the same size render
+# each text and glyph only once.
+text_cache = TextCache(max_entries=256 * (1 + len(args.output)))
+outputs = [DisplayOutput(screen)]
+for spec in args.output:
     try:
-        with open(STATE_FILE, "r") as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        data = {
-            "stopwatch_running": False,
-            "elapsed_ms": 0,
-            "mode": "index",
-            "message": "Nachricht",
-            "teams": [
-                {"name": "Team 1", "score": 0, "color": [91, 124, 255]},
-                {"name": "Team 2", "score": 0, "color": [214, 76, 76]}
-            ],
-            "last_start_ts": None
-        }
-        save_state(data)
-    return data
-
-def wrap_text(text, font, max_width):
-    
-    #Splits text into multiple lines so that each line
-    #fits within max_width. Line breaks occur only at whole words.
-    
-    words = text.split(" ")
-    lines = []
-    current_line = ""
-
-    for word in words:
-        # Test if adding the next word exceeds the max width
-        test_line = current_line + (" " if current_line else "") + word
-        if font.size(test_line)[0] <= max_width:
-            current_line = test_line
-        else:
-            # Start a new line
-            if current_line:
-                lines.append(current_line)
-            current_line = word
-
-    # Add the last line
-    if current_line:
-        lines.append(current_line)
+        size, position, mode = parse_output(spec)
+    except ValueError as e:
+        parser.error(str(e))
+    outputs.append(WindowOutput(size, position, mode, title="Scoreboard"))
+for output in outputs:
+    output.renderer = Renderer(*output.size, text_cache=text_cache)
+
+# --- Renderer of the main screen (cached background + dirty-rectangle updates) ---
+renderer = outputs[0].renderer
+
+# --- Path to state.json (of the server's default board; others live below it) ---
+STATE_FILE = board_state_file(
+    os.environ.get("SCOREBOARD_STATE_FILE", "/home/lori/VWA/scoreboard_web/state.json"), args.board
+)
+
+# --- Socket the server pushes state changes to ---
+STATE_SOCKET = os.path.join(os.path.dirname(STATE_FILE), "state.sock")
+
+# --- State handling ---
+# The display never writes state.json; the server owns it. Until the
+# first valid read (or if the file is missing) these defaults are shown.
+DEFAULT_STATE = {
+    "clocks": default_clocks(),
+    "mode": "index",
+    "message": "Nachricht",
+    "teams": [
+        {"name": "Team 1", "score": 0, "color": [91, 124, 255]},
+        {"name": "Team 2", "score": 0, "color": [214, 76, 76]}
+    ]
+}
 
+def load_state():
+    # None if the file is missing/invalid -> the watcher keeps the last good state
+    state = read_state(STATE_FILE)
+    if state is not None:
+        migrate_legacy_clocks(state)
+    return state
+
+# --- State source ---
+# Changes are pushed by the server over STATE_SOCKET. While the server is
+# not reachable, state.json is re-read whenever it changed.
+state_watcher = ChannelStateWatcher(
+    StateSubscriber(STATE_SOCKET),
+    StateWatcher(STATE_FILE, load_state, DEFAULT_STATE)
+)
+
+# --- Metrics ---
+# Exported to a file next to state.json; the server's /metrics includes it
+REGISTRY.prefix = "scoreboard_display_"
+METRICS_FILE = os.path.join(os.path.dirname(STATE_FILE), "display_metrics.prom")
+METRICS_INTERVAL = 10.0
+
+FRAME_SECONDS = REGISTRY.histogram(
+    "frame_duration_seconds", "Time to produce one frame (without the idle wait)"
+)
+PHASE_SECONDS = REGISTRY.histogram(
+    "frame_phase_duration_seconds", "Time per frame phase", ("phase",)
+)
+STARTUP_SECONDS = REGISTRY.histogram(
+    "startup_duration_seconds", "Time from start until the first frame is on screen"
+)
+renderer.phase_seconds = PHASE_SECONDS
+
+OVERLAY_PHASES = ("state", "layout", "render", "flip")
+overlay_totals = {}
+
+def debug_overlay_lines(interval):
+    # Frame rate and mean phase times since the last overlay update,
+    # from the histogram sums/counts
+    frames = FRAME_SECONDS.labels()
+    previous_frames = overlay_totals.get("frames", 0)
+    overlay_totals["frames"] = frames.count
+    lines = [f"{(frames.count - previous_frames) / interval:5.1f} fps"]
+
+    for phase in OVERLAY_PHASES:
+        series = PHASE_SECONDS.labels(phase)
+        count, total = overlay_totals.get(phase, (0, 0.0))
+        overlay_totals[phase] = (series.count, series.sum)
+        if series.count > count:
+            mean_ms = (series.sum - total) / (series.count - count) * 1000
+            lines.append(f"{phase:7} {mean_ms:6.2f} ms")
+    if video is not None:
+        lines.append(f"video   {video.encoded} enc, {video.dropped} dropped")
     return lines
 
-def get_fitting_font(text, base_font_name, max_width, max_height, max_size, min_size):
-   
-    #Returns a pygame Font object with the largest possible size
-    #that allows 'text' to fit within max_width and max_height.
-    
-    font_size = max_size
-
-    while font_size >= min_size:
-        font = pygame.font.SysFont(base_font_name, font_size)
-        # Wrap text based on current font size
-        lines = wrap_text(text, font, max_width)
-        line_height = font.get_height()
-        text_height = line_height * len(lines)
-        text_width = max(font.size(line)[0] for line in lines)
-
-        if text_width <= max_width and text_height <= max_height:
-            return font, lines  # fits perfectly
-
-        font_size -= 2  # try smaller font
-
-    # If nothing fits, return min size
-    font = pygame.font.SysFont(base_font_name, min_size)
-    lines = wrap_text(text, font, max_width)
-    return font, lines
-
-def format_hms(ms):
-    total = ms // 1000
-    h = total // 3600
-    m = (total % 3600) // 60
-    s = total % 60
-    return f"{h:02}:{m:02}:{s:02}"
-
-# --- Time variables ---
-state = load_state()
-total_elapsed = state.get("elapsed_ms", 0) / 1000
-last_tick = time.time()
+next_metrics_export = time.monotonic() + METRICS_INTERVAL
+overlay_updated_at = time.monotonic()
 
 running = True
 while running:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
-
-    # Load state from file
-    state = load_state()
-    mode = state.get("mode", "index")
-    message_text = state.get("message", "Nachricht")
-    stopwatch_running = state.get("stopwatch_running", False)
-
-    current_time = time.time()
-
-    # --- Calculate stopwatch time ---
-    if stopwatch_running and state.get("last_start_ts"):
-        # total_elapsed = stored time + time elapsed since last start
-        total_elapsed = state.get("elapsed_ms", 0) / 1000 + (current_time - state["last_start_ts"] / 1000)
-    elif not stopwatch_running:
-        # If stopwatch is stopped or reset, use stored state only
-        total_elapsed = state.get("elapsed_ms", 0) / 1000
-
-    hours = int(total_elapsed // 3600)
-    minutes = int((total_elapsed % 3600) // 60)
-    seconds = int(total_elapsed % 60)
-    milliseconds = int((total_elapsed - int(total_elapsed)) * 1000) // 10
-
-    time_text = f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:02}"
-
-    # --- Always use white background ---
-    screen.fill((255, 255, 255))
-
-    # --- Current time and date ---
-    now = datetime.datetime.now(ZoneInfo("Europe/Vienna"))
-
-    weekday = GERMAN_WEEKDAYS[now.weekday()]
-    now_time = f"{now.hour:02}:{now.minute:02}:{now.second:02}"
-    date_text = f"{weekday}, {now.day:02}.{now.month:02}.{now.year}"
-
-    # Always display date at the top-right
-    date_surface = date_font_small.render(date_text, True, (0, 0, 0))
-    screen.blit(date_surface, (WIDTH - date_surface.get_width() - 10, 10))
-
-    if mode == "index":
-        # Large centered time display
-        time_surface = clock_font_large.render(now_time, True, (0, 0, 0))
-        screen.blit(
-            time_surface,
-            ((WIDTH - time_surface.get_width()) // 2,
-            (HEIGHT - time_surface.get_height()) // 2)
-        )
-    else:
-        # Small time display at the top-left
-        clock_surface = clock_font_small.render(now_time, True, (0, 0, 0))
-        screen.blit(clock_surface, (10, 10))
-
-    if mode == "stopwatch":
-        # Blue box (same style as message/timer)
-        box_width = WIDTH * 0.7
-        box_height = HEIGHT * 0.4
-        box_x = (WIDTH - box_width) / 2
-        box_y = (HEIGHT - box_height) / 2
-
-        rect = pygame.Rect(box_x, box_y, box_width, box_height)
-        pygame.draw.rect(screen, (91, 124, 255), rect, border_radius=40)
-
-        # Stopwatch time (white, centered)
-        text_surface = font.render(time_text, True, (255, 255, 255))
-        screen.blit(
-            text_surface,
-            ((WIDTH - text_surface.get_width()) // 2,
-            (HEIGHT - text_surface.get_height()) // 2)
-        )
-
-    elif mode == "message":
-        padding = 40
-
-        # Original box size
-        base_box_width = int(WIDTH * 0.7)
-        base_box_height = int(HEIGHT * 0.4)
-        box_width = base_box_width
-        box_height = base_box_height
-
-        # Maximum allowed size (safe area)
-        top_margin = 160
-        bottom_margin = 60  # distance to bottom screen edge
-        max_box_width = int(WIDTH * 0.9)
-        max_box_height = HEIGHT - top_margin - bottom_margin
-
-        # Max & Min font sizes
-        MAX_FONT_SIZE = 180
-        MIN_FONT_SIZE = 50
-
-        # Get optimal font and wrapped lines
-        font, lines = get_fitting_font(
-            message_text, "Arial",
-            max_box_width - 2 * padding,
-            max_box_height - 2 * padding,
-            MAX_FONT_SIZE,
-            MIN_FONT_SIZE
-        )
-
-        # Text dimensions
-        line_height = font.get_height()
-        text_height = line_height * len(lines)
-        text_width = max(font.size(line)[0] for line in lines)
-
-        # Adjust box width if text is wider than base
-        if text_width + 2 * padding > base_box_width:
-            box_width = min(text_width + 2 * padding, max_box_width)
-
-        # Adjust box height **only if text is taller than base**
-        if text_height + 2 * padding > base_box_height:
-            box_height = min(text_height + 2 * padding, max_box_height)
-
-        # Center box horizontally and vertically like stopwatch
-        box_x = (WIDTH - box_width) // 2
-        box_y = (HEIGHT - box_height) // 2
-
-        # Draw box
-        rect = pygame.Rect(box_x, box_y, box_width, box_height)
-        pygame.draw.rect(screen, (91, 124, 255), rect, border_radius=40)
-
-        # Text vertical positioning
-        if text_height + 2 * padding >= box_height:
-            y_offset = box_y + padding  # start at top padding if text is too tall
-        else:
-            y_offset = box_y + (box_height - text_height) // 2  # center vertically
-
-        # Draw text lines
-        for line in lines:
-            line_surface = font.render(line, True, (255, 255, 255))
-            x = box_x + (box_width - line_surface.get_width()) // 2
-            screen.blit(line_surface, (x, y_offset))
-            y_offset += line_height
-    elif mode == "scores_and_teams":
-        teams = state.get("teams", [])
-
-        # --- Layout constants ---
-        top_margin = 120            # Original distance from top (same as before)
-        spacing_between_boxes = 40   # Horizontal spacing between team boxes
-        time_margin = 20             # Space between boxes and game time
-        bottom_margin = time_margin  # Make distance from time to bottom same as time_margin
-
-        num_teams = min(2, len(teams))
-        card_width = WIDTH // 2 - spacing_between_boxes * 1.5
-
-        # Calculate box height (top margin stays unchanged)
-        card_height = (
-            HEIGHT
-            - top_margin
-            - game_time_font.get_height()
-            - time_margin
-            - bottom_margin
-        )
-
-        # Y position of the boxes (fixed top margin)
-        y = top_margin
-
-        # --- Draw team boxes ---
-        for i, team in enumerate(teams[:2]):
-            x = spacing_between_boxes + i * (card_width + spacing_between_boxes)
-
-            color = team.get("color", [80, 80, 80])
-            name = team.get("name", "Team")
-            score = str(team.get("score", 0))
-
-            # Draw the box
-            rect = pygame.Rect(x, y, card_width, card_height)
-            pygame.draw.rect(screen, color, rect, border_radius=40)
-
-            # Draw team name at top of box
-            name_surf = team_font.render(name, True, (255, 255, 255))
-            screen.blit(
-                name_surf,
-                (x + (card_width - name_surf.get_width()) // 2, y + 20)
-            )
-
-            # Draw the score centered in the box
-            score_surf = score_font.render(score, True, (255, 255, 255))
-            screen.blit(
-                score_surf,
-                (x + (card_width - score_surf.get_width()) // 2,
-                y + (card_height - score_surf.get_height()) // 2)
-            )
-
-        # --- Draw the game time below the boxes ---
-        elapsed = state.get("game_elapsed_ms", 0)
-        if state.get("game_clock_running") and state.get("game_last_start_ts"):
-            elapsed += int(time.time() * 1000 - state["game_last_start_ts"])
-
-        time_text = format_hms(elapsed)
-        time_surf = game_time_font.render(time_text, True, (0, 0, 0))  # Black text
-
-        # Center horizontally
-        time_x = (WIDTH - time_surf.get_width()) // 2
-
-        # Position vertically: symmetric spacing
-        time_y = y + card_height + time_margin  # distance from boxes
-        screen.blit(time_surf, (time_x, time_y))
-    elif mode == "timer":
-        timer_duration = state.get("timer_duration", 0)
-        timer_start_ts = state.get("timer_start_ts", 0)
-        timer_running = state.get("timer_running", False)
-
-        remaining = float(timer_duration)
-
-        if timer_running and timer_start_ts > 0:
-            elapsed = time.time() - timer_start_ts
-            remaining = max(0.0, timer_duration - elapsed)
-
-        minutes = int(remaining // 60)
-        seconds = int(remaining % 60)
-        centiseconds = int((remaining - int(remaining)) * 100)
-
-        time_text = f"{minutes:02}:{seconds:02}.{centiseconds:02}"
-
-        # Blue Box
-        box_width = WIDTH * 0.7
-        box_height = HEIGHT * 0.4
-        box_x = (WIDTH - box_width) / 2
-        box_y = (HEIGHT - box_height) / 2
-
-        rect = pygame.Rect(box_x, box_y, box_width, box_height)
-        pygame.draw.rect(screen, (91, 124, 255), rect, border_radius=40)
-
-        # Time (white)
-        timer_surface = font.render(time_text, True, (255, 255, 255))
-        screen.blit(
-            timer_surface,
-            ((WIDTH - timer_surface.get_width()) // 2,
-            (HEIGHT - timer_surface.get_height()) // 2)
-        )
-
-    pygame.display.flip()
-    clock.tick(60)
-
+        elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWRESTORED):
+            # Window contents were lost, redraw everything
+            for output in outputs:
+                output.renderer.invalidate()
+        elif event.type == pygame.WINDOWCLOSE:
+            # Closing an additional window only removes that output
+            for output in outputs[1:]:
+                if output.window == getattr(event, "window", None):
+                    output.close()
+                    outputs.remove(output)
+
+    frame_start = time.perf_counter()
+
+    # Get state (pushed by the server, or re-read when the file changed)
+    state, _ = state_watcher.poll()
+    state_done = time.perf_counter()
+    PHASE_SECONDS.labels("state").observe(state_done - frame_start)
+
+    # Evaluate all clocks once for this frame
+    instant = current_instant()
+    clocks = read_clocks(state, instant)
+
+    # Draw the frame on every output and push only the regions that changed
+    shown = [output.shown_state(state) for output in outputs]
+    dirty = [
+        output.renderer.draw(output.surface, output_state, instant.wall, clocks, full=args.full_redraw)
+        for output, output_state in zip(outputs, shown)
+    ]
+    draw_done = time.perf_counter()
+    for output, rects in zip(outputs, dirty):
+        if rects:
+            output.present(rects)
+    frame_done = time.perf_counter()
+    PHASE_SECONDS.labels("flip").observe(frame_done - draw_done)
+    FRAME_SECONDS.observe(frame_done - frame_start)
+    if started_at is not None:
+        STARTUP_SECONDS.observe(frame_done - started_at)
+        started_at = None
+
+    # With --video-on-change an unchanged frame is not encoded at all;
+    # otherwise the encoder repeats the last frame to keep its rate
+    if video is not None and (dirty[0] or not args.video_on_change):
+        video.submit(screen, instant.mono)
+
+    now_monotonic = time.monotonic()
+    if args.debug_overlay and now_monotonic - overlay_updated_at >= 1.0:
+        renderer.overlay_lines = debug_overlay_lines(now_monotonic - overlay_updated_at)
+        overlay_updated_at = now_monotonic
+    if now_monotonic >= next_metrics_export:
+        try:
+            REGISTRY.write_textfile(METRICS_FILE)
+        except OSError:
+            pass
+        next_metrics_export = now_monotonic + METRICS_INTERVAL
+
+    # Wait for the next visible change (or a state change)
+    scheduler.wait(shown, clocks, instant, state_watcher)
+
+state_watcher.close()
+for output in outputs:
+    output.close()
+if video is not None:
+    video.close()
 pygame.quit()
 sys.exit()
@@ -0,0 +1,145 @@
+import os
+import time
+
+from state_file import state_version
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+
+class StateWatcher:
+    # Keeps the parsed state in memory and only calls load() again when
+    # the state file actually changed on disk.
+    #
+    # With pyinotify the directory of the file is watched (so atomic
+    # renames are seen too). Without it, every poll compares the
+    # mtime/size/inode of the file, which is a single stat() call.
+    #
+    # load() returns None when the file is missing or invalid; the last
+    # good state (or 'default') is kept then. A re-read file with the same
+    # version as the current state does not count as a change.
+
+    def __init__(self, path, load, default=None):
+        self.path = path
+        self.load = load
+        self.state = default
+        self._dirty = True
+        self._stat_key = None
+        self._notifier = None
+
+        if pyinotify is not None:
+            try:
+                self._setup_inotify()
+            except (OSError, pyinotify.WatchManagerError):
+                self._notifier = None
+
+    def _setup_inotify(self):
+        watcher = self
+        name = os.path.basename(self.path)
+
+        class _Handler(pyinotify.ProcessEvent):
+            def process_default(self, event):
+                if event.name == name:
+                    watcher._dirty = True
+
+        wm = pyinotify.WatchManager()
+        mask = (
+            pyinotify.IN_CLOSE_WRITE
+            | pyinotify.IN_MOVED_TO
+            | pyinotify.IN_CREATE
+            | pyinotify.IN_DELETE
+        )
+        wm.add_watch(os.path.dirname(self.path) or ".", mask, quiet=False)
+        self._notifier = pyinotify.Notifier(wm, _Handler(), timeout=0)
+
+    def _file_changed(self, timeout=0):
+        if self._notifier is not None:
+            if self._notifier.check_events(timeout=int(timeout * 1000)):
+                self._notifier.read_events()
+                self._notifier.process_events()
+            return self._dirty
+
+        if timeout:
+            time.sleep(timeout)
+
+        try:
+            st = os.stat(self.path)
+            key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            key = None
+
+        if key != self._stat_key:
+            self._stat_key = key
+            self._dirty = True
+        return self._dirty
+
+    def wait(self, timeout):
+        # Blocks for up to 'timeout' seconds, returns early (True) as soon
+        # as the file changed. The change is picked up by the next poll().
+        return self._file_changed(timeout)
+
+    def poll(self):
+        # Returns (state, changed). 'changed' is True only on the frames
+        # where the file was re-read.
+        if not self._file_changed():
+            return self.state, False
+
+        self._dirty = False
+        data = self.load()
+        if data is None:
+            return self.state, False
+        if "version" in data and state_version(data) == state_version(self.state):
+            return self.state, False
+
+        self.state = data
+        return self.state, True
+
+    def close(self):
+        if self._notifier is not None:
+            self._notifier.stop()
+            self._notifier = None
+
+
+class ChannelStateWatcher:
+    # Prefers the state pushed by the server over the Unix socket
+    # (state_channel.StateSubscriber) and only falls back to watching the
+    # file while the server is not reachable. Same interface as
+    # StateWatcher: poll(), wait(timeout), close().
+
+    RECONNECT_INTERVAL = 2.0
+
+    def __init__(self, subscriber, file_watcher):
+        self.subscriber = subscriber
+        self.file_watcher = file_watcher
+        self.state = file_watcher.state
+        self._next_connect = 0.0
+
+    def _ensure_connected(self):
+        if self.subscriber.connected or time.monotonic() < self._next_connect:
+            return
+        if not self.subscriber.connect():
+            self._next_connect = time.monotonic() + self.RECONNECT_INTERVAL
+
+    def poll(self):
+        self._ensure_connected()
+
+        state = None
+        if self.subscriber.connected:
+            state, _ = self.subscriber.poll()
+        if not self.subscriber.connected or state is None:
+            state, _ = self.file_watcher.poll()
+
+        changed = state is not self.state
+        self.state = state
+        return state, changed
+
+    def wait(self, timeout):
+        if self.subscriber.connected:
+            return self.subscriber.wait(timeout)
+        return self.file_watcher.wait(timeout)
+
+    def close(self):
+        self.subscriber.close()
+        self.file_watcher.close()
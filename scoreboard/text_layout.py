@@ -0,0 +1,155 @@
+import functools
+
+from fonts import get_font
+
+# Measured widths per font: {font: {word: width}}. Fonts are kept for the
+# whole run (see fonts.get_font), so the font object is the key.
+_word_widths = {}
+
+# Words remembered per font before its cache is started over
+MAX_CACHED_WORDS = 4096
+
+HYPHEN = "-"
+
+
+def word_width(font, word):
+    # Width of 'word' in 'font', measured once
+    widths = _word_widths.get(font)
+    if widths is None:
+        widths = _word_widths[font] = {}
+    width = widths.get(word)
+    if width is None:
+        if len(widths) >= MAX_CACHED_WORDS:
+            widths.clear()
+        width = widths[word] = font.size(word)[0]
+    return width
+
+
+def _break_word(word, font, max_width):
+    # Splits a word that is wider than max_width into hyphenated pieces.
+    # The longest fitting prefix is found by binary search, so a piece
+    # costs O(log n) measurements. Every piece has at least one character.
+    pieces = []
+    while word_width(font, word) > max_width and len(word) > 1:
+        lo, hi = 1, len(word) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if font.size(word[:mid] + HYPHEN)[0] <= max_width:
+                lo = mid
+            else:
+                hi = mid - 1
+        pieces.append(word[:lo] + HYPHEN)
+        word = word[lo:]
+    pieces.append(word)
+    return pieces
+
+
+def layout_lines(text, font, max_width, break_words=True):
+
+    #Lays out 'text' in lines no wider than max_width.
+    #Returns (lines, line widths, broken): broken is True if a word was
+    #wider than max_width and had to be split (or, with break_words=False,
+    #was left sticking out).
+    #
+    #Every distinct word is measured once per font; a line's width is the
+    #running sum of its word widths and spaces, so the layout is linear in
+    #the length of the text. Explicit newlines start a new line and empty
+    #lines are kept (paragraphs).
+
+    space = word_width(font, " ")
+    lines = []
+    widths = []
+    broken = False
+
+    for paragraph in text.strip().splitlines():
+        line = []
+        line_width = 0
+
+        for word in paragraph.split():
+            width = word_width(font, word)
+            if width > max_width:
+                broken = True
+                if break_words:
+                    if line:
+                        lines.append(" ".join(line))
+                        widths.append(line_width)
+                    pieces = _break_word(word, font, max_width)
+                    for piece in pieces[:-1]:
+                        lines.append(piece)
+                        widths.append(word_width(font, piece))
+                    word = pieces[-1]
+                    line, line_width = [word], word_width(font, word)
+                    continue
+
+            candidate = line_width + space + width
+            fits = candidate <= max_width
+            if line and fits and candidate >= max_width - len(line):
+                # Close to the edge the rounded word widths can be off by
+                # a pixel each: measure the line itself
+                fits = font.size(" ".join(line) + " " + word)[0] <= max_width
+
+            if line and fits:
+                line.append(word)
+                line_width += space + width
+            else:
+                # Start a new line
+                if line:
+                    lines.append(" ".join(line))
+                    widths.append(line_width)
+                line, line_width = [word], width
+
+        # Add the last line (an empty one for an empty paragraph)
+        lines.append(" ".join(line))
+        widths.append(line_width)
+
+    return lines, widths, broken
+
+
+def wrap_text(text, font, max_width):
+
+    #Splits text into multiple lines so that each line
+    #fits within max_width. Line breaks occur at whole words; only words
+    #that are wider than max_width on their own are hyphenated.
+
+    return layout_lines(text, font, max_width)[0]
+
+def text_fits(text, font, max_width, max_height):
+    # Fits only if no word had to be split, so get_fitting_font() rather
+    # shrinks the font than hyphenates
+    lines, widths, broken = layout_lines(text, font, max_width, break_words=False)
+    text_height = font.get_height() * len(lines)
+    text_width = max(widths, default=0)
+    fits = not broken and text_width <= max_width and text_height <= max_height
+    return fits, lines
+
+@functools.lru_cache(maxsize=32)
+def get_fitting_font(text, base_font_name, max_width, max_height, max_size, min_size):
+
+    #Returns a pygame Font object with the largest possible size
+    #that allows 'text' to fit within max_width and max_height.
+    #The result is memoized per (text, box), so message mode only
+    #fits the text again when the message or the box changes.
+
+    # Candidate sizes in steps of 2 (min_size ... max_size)
+    sizes = list(range(max_size, min_size - 1, -2))[::-1]
+
+    # Binary search for the largest size that still fits
+    best = None
+    lo, hi = 0, len(sizes) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        font = get_font(base_font_name, sizes[mid])
+        fits, lines = text_fits(text, font, max_width, max_height)
+        if fits:
+            best = (font, lines)  # fits, try larger
+            lo = mid + 1
+        else:
+            hi = mid - 1  # try smaller font
+
+    if best is not None:
+        return best
+
+    # If nothing fits, return min size (long words hyphenated)
+    font = get_font(base_font_name, min_size)
+    lines = wrap_text(text, font, max_width)
+    return font, lines
@@ -0,0 +1,169 @@
+import queue
+import sys
+import threading
+import time
+from fractions import Fraction
+
+import av
+import numpy as np
+import pygame
+
+from metrics import REGISTRY
+
+# Frames waiting for the encoder. When the encoder falls behind, new
+# frames are dropped instead of blocking the render loop.
+QUEUE_SIZE = 4
+
+# Container format per URL scheme; files are guessed from the extension
+# and a pipe ("-", stdout) gets MPEG-TS
+STREAM_FORMATS = {
+    "rtmp": "flv",
+    "rtmps": "flv",
+    "udp": "mpegts",
+    "tcp": "mpegts",
+    "srt": "mpegts",
+}
+
+ENCODE_SECONDS = REGISTRY.histogram(
+    "video_encode_duration_seconds", "Time to convert and encode one video frame"
+)
+
+
+def _container(target):
+    if target == "-":
+        return av.open(sys.stdout.buffer, "w", format="mpegts"), True
+    scheme = target.split("://", 1)[0] if "://" in target else None
+    if scheme is not None:
+        return av.open(target, "w", format=STREAM_FORMATS.get(scheme)), True
+    return av.open(target, "w"), False
+
+
+def _pixel_format(surface):
+    # ffmpeg name of the byte order of a 32 bit surface
+    shifts = surface.get_shifts()[:3]
+    if surface.get_bytesize() == 4:
+        if shifts == (16, 8, 0):
+            return "bgra"
+        if shifts == (0, 8, 16):
+            return "rgba"
+    return None
+
+
+class VideoEncoder:
+    # Encodes rendered frames to H.264 in a background thread.
+    #
+    # submit() copies the surface's pixel buffer once (the render loop
+    # keeps drawing into the surface) and hands it to the encoder thread;
+    # everything else (color conversion, scaling, encoding, muxing)
+    # happens there. With on_change=False the encoder repeats the last
+    # frame so the output keeps 'fps' even while the display only draws
+    # once a second; with on_change=True only submitted frames are
+    # encoded (variable frame rate, for recordings of the slow modes).
+
+    def __init__(self, target, width, height, fps=30, bitrate=4_000_000,
+                 size=None, on_change=False):
+        self.fps = fps
+        self.on_change = on_change
+        self.dropped = 0
+        self.encoded = 0
+        # Set (and no more frames accepted) if the output failed
+        self.error = None
+        self._interval = 1.0 / fps
+        self._last_submit = None
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+        self._output, live = _container(target)
+        out_width, out_height = size or (width, height)
+        self._stream = self._output.add_stream("libx264", rate=fps)
+        self._stream.width = out_width - out_width % 2
+        self._stream.height = out_height - out_height % 2
+        self._stream.pix_fmt = "yuv420p"
+        self._stream.bit_rate = bitrate
+        # Timestamps in milliseconds, so frames can come at any rate
+        self._stream.codec_context.time_base = Fraction(1, 1000)
+        self._stream.options = {"preset": "veryfast"}
+        if live:
+            self._stream.options["tune"] = "zerolatency"
+
+        self._start = None
+        self._last_pts = -1
+        self._thread = threading.Thread(target=self._work, name="video-encoder", daemon=True)
+        self._thread.start()
+
+    def due(self, now):
+        # True if a frame submitted at monotonic time 'now' would be used
+        return self._last_submit is None or now - self._last_submit >= self._interval
+
+    def submit(self, surface, now):
+        # now: time.monotonic() of the frame
+        if self.error is not None or not self.due(now):
+            return
+        self._last_submit = now
+
+        pixel_format = _pixel_format(surface)
+        if pixel_format is None:
+            # Slow path for surfaces that are not 32 bit
+            data = pygame.image.tobytes(surface, "RGB")
+            pitch, pixel_format = surface.get_width() * 3, "rgb24"
+        else:
+            data, pitch = surface.get_buffer().raw, surface.get_pitch()
+
+        try:
+            self._queue.put_nowait((now, data, pitch, pixel_format, surface.get_size()))
+        except queue.Full:
+            self.dropped += 1
+
+    def _frame(self, data, pitch, pixel_format, size):
+        width, height = size
+        channels = 3 if pixel_format == "rgb24" else 4
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(height, pitch // channels, channels)
+        return av.VideoFrame.from_ndarray(pixels[:, :width], format=pixel_format)
+
+    def _encode(self, frame, now):
+        if self._start is None:
+            self._start = now
+        pts = max(int((now - self._start) * 1000), self._last_pts + 1)
+        self._last_pts = pts
+        frame.pts = pts
+        frame.time_base = self._stream.codec_context.time_base
+        for packet in self._stream.encode(frame):
+            self._output.mux(packet)
+        self.encoded += 1
+
+    def _work(self):
+        try:
+            self._encode_loop()
+            for packet in self._stream.encode(None):
+                self._output.mux(packet)
+        except (av.FFmpegError, OSError) as e:
+            # E.g. the stream target went away; the display keeps running
+            self.error = str(e)
+            print(f"Video output stopped: {e}", file=sys.stderr)
+        finally:
+            self._output.close()
+
+    def _encode_loop(self):
+        last_frame = None
+        while True:
+            try:
+                timeout = None if self.on_change or last_frame is None else self._interval
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                # Nothing new: repeat the last picture to keep the rate
+                self._encode(last_frame, time.monotonic())
+                continue
+
+            if item is None:
+                return
+
+            now, data, pitch, pixel_format, size = item
+            with ENCODE_SECONDS.time():
+                last_frame = self._frame(data, pitch, pixel_format, size)
+                self._encode(last_frame, now)
+
+    def close(self):
+        # Flushes the encoder and closes the output
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+
@@ -0,0 +1,107 @@
+import copy
+import os
+import re
+import threading
+
+from clocks import migrate_legacy_clocks
+from events import EventHub
+from operations import IdempotencyCache
+from state_channel import StatePublisher
+from state_file import DEFAULT_BOARD, board_state_file
+from state_store import StateStore
+
+BOARD_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")
+
+# Every board costs a few threads and an open socket
+MAX_BOARDS = 32
+
+
+class Board:
+    # One scoreboard (court) with everything that used to be global in
+    # server.py: the state store (and its lock), the socket its displays
+    # subscribe to, the /events hub and the idempotency cache. Boards
+    # share no locks, so traffic on one court never waits for another.
+
+    def __init__(self, board_id, state_file, defaults, **store_options):
+        self.id = board_id
+        self.state_file = state_file
+        directory = os.path.dirname(state_file)
+        os.makedirs(directory, exist_ok=True)
+
+        # Metrics the board's display exports (read by /metrics)
+        self.display_metrics_file = os.path.join(directory, "display_metrics.prom")
+
+        self.publisher = StatePublisher(os.path.join(directory, "state.sock"))
+        self.events = EventHub()
+        self.idempotency = IdempotencyCache()
+        self.store = StateStore(state_file, defaults, on_change=self.publish, **store_options)
+
+        if "clocks" not in self.store.snapshot():
+            with self.store.mutate(durable=True) as state:
+                migrate_legacy_clocks(state)
+        self.publish(self.store.snapshot())
+
+    @property
+    def url_prefix(self):
+        return "" if self.id == DEFAULT_BOARD else f"/b/{self.id}"
+
+    def publish(self, state):
+        self.publisher.publish(state)
+        self.events.publish(state)
+
+    def set_mode(self, mode, message=None):
+        with self.store.mutate() as state:
+            state["mode"] = mode
+            if message is not None:
+                state["message"] = message
+
+    def close(self):
+        self.events.close()
+        self.store.close()
+        self.publisher.close()
+
+
+class BoardRegistry:
+    # Boards by id: the default board plus the ones listed in board_ids
+    # (SCOREBOARD_BOARDS in server.py). Boards are only created here, at
+    # startup: a request for any other id gets None (404), so typos and
+    # crawlers cannot create directories, sockets and threads.
+
+    def __init__(self, state_file, defaults, board_ids=(), max_boards=MAX_BOARDS,
+                 **store_options):
+        self.state_file = state_file
+        self._boards = {}
+        self._lock = threading.Lock()
+
+        board_ids = [DEFAULT_BOARD] + [b for b in board_ids if b != DEFAULT_BOARD]
+        for board_id in board_ids:
+            if not BOARD_ID_PATTERN.match(board_id):
+                raise ValueError(f"invalid board id {board_id!r}")
+        if len(set(board_ids)) > max_boards:
+            raise ValueError(f"at most {max_boards} boards are supported")
+
+        for board_id in board_ids:
+            if board_id not in self._boards:
+                self._boards[board_id] = Board(
+                    board_id, board_state_file(state_file, board_id),
+                    copy.deepcopy(defaults), **store_options
+                )
+
+    def get(self, board_id):
+        # Returns the board, or None for an unknown id
+        return self._boards.get(board_id)
+
+    def ids(self):
+        return sorted(self._boards)
+
+    def end_streams(self):
+        # Ends the /events streams of every board
+        with self._lock:
+            for board in self._boards.values():
+                board.events.close()
+
+    def close(self):
+        # Flushes and closes every board
+        with self._lock:
+            for board in self._boards.values():
+                board.close()
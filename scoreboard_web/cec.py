@@ -0,0 +1,142 @@
+import atexit
+import itertools
+import queue
+import shlex
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+# Long-running cec-client reading commands from stdin (no -s single mode).
+# Can be replaced with a stub via the CEC_CLIENT environment variable.
+DEFAULT_CEC_CLIENT = "cec-client -d 1"
+
+# Number of finished jobs kept for /cec/jobs/<id>
+MAX_JOBS = 100
+
+CEC_QUEUE_SECONDS = REGISTRY.histogram(
+    "cec_queue_wait_seconds", "Time a CEC command waited in the queue"
+)
+CEC_COMMAND_SECONDS = REGISTRY.histogram(
+    "cec_command_duration_seconds",
+    "Time to hand a command to cec-client (including starting it)",
+    ("command",)
+)
+CEC_START_SECONDS = REGISTRY.histogram(
+    "cec_process_start_seconds", "Time to start the cec-client process"
+)
+
+
+class CecService:
+    # Sends CEC commands to one long-lived cec-client process.
+    #
+    # Opening the CEC adapter takes seconds, so the process is started once
+    # (on the first command) and kept open; commands are written to its
+    # stdin by a worker thread. submit() returns immediately with a job.
+    # Submitting a command that is already waiting in the queue returns the
+    # existing job instead of queueing it twice.
+
+    def __init__(self, command=DEFAULT_CEC_CLIENT):
+        self.command = shlex.split(command)
+        self._process = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._queued = {}
+        self._submitted_at = {}
+        self._ids = itertools.count(1)
+
+        self._worker = threading.Thread(target=self._work, name="cec-worker", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def submit(self, cec_command):
+        with self._lock:
+            job = self._queued.get(cec_command)
+            if job is not None:
+                return dict(job)
+
+            job = {"id": next(self._ids), "command": cec_command, "status": "queued"}
+            self._submitted_at[job["id"]] = time.perf_counter()
+            self._jobs[job["id"]] = job
+            self._queued[cec_command] = job
+            while len(self._jobs) > MAX_JOBS:
+                self._jobs.popitem(last=False)
+
+        self._queue.put(job)
+        return dict(job)
+
+    def job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _set_status(self, job, status, error=None):
+        with self._lock:
+            job["status"] = status
+            if error is not None:
+                job["error"] = error
+            if status != "queued":
+                self._queued.pop(job["command"], None)
+
+    def _ensure_process(self):
+        if self._process is not None and self._process.poll() is None:
+            return self._process
+
+        with CEC_START_SECONDS.time():
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+            )
+        return self._process
+
+    def _send(self, cec_command):
+        # One retry with a fresh process if the old one died
+        for attempt in range(2):
+            process = self._ensure_process()
+            try:
+                process.stdin.write(cec_command + "\n")
+                process.stdin.flush()
+                return
+            except (BrokenPipeError, OSError):
+                self._process = None
+                if attempt:
+                    raise
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            with self._lock:
+                submitted_at = self._submitted_at.pop(job["id"], None)
+            if submitted_at is not None:
+                CEC_QUEUE_SECONDS.observe(time.perf_counter() - submitted_at)
+
+            self._set_status(job, "running")
+            try:
+                with CEC_COMMAND_SECONDS.labels(job["command"]).time():
+                    self._send(job["command"])
+            except OSError as e:
+                self._set_status(job, "failed", str(e))
+            else:
+                self._set_status(job, "done")
+
+    def close(self):
+        self._queue.put(None)
+        process, self._process = self._process, None
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.write("q\n")
+            process.stdin.close()
+            process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
@@ -0,0 +1,138 @@
+import json
+import os
+import time
+
+from metrics import REGISTRY
+from state_channel import state_diff
+
+# The log is a JSON-lines file next to the snapshot (state.json):
+#   {"version": 8, "ts": 1700000000.123, "set": {...}, "unset": [...]}
+# Like the state channel diffs, a record only replaces top-level keys.
+# The current state is the snapshot plus every record with a higher
+# version. After a snapshot the log's records are appended to the history
+# file of the day (state_history/2026-10-18.log) and the log starts over,
+# so the full match history stays on disk without slowing down startup.
+
+LOG_APPEND_SECONDS = REGISTRY.histogram(
+    "state_log_append_duration_seconds", "Time to append a record to the state log", ("fsync",)
+)
+LOG_REPLAY_SECONDS = REGISTRY.histogram(
+    "state_log_replay_duration_seconds", "Time to replay the state log on startup"
+)
+
+
+def log_paths(state_path):
+    # state.json -> (state.log, state_history/)
+    base = os.path.splitext(state_path)[0]
+    return base + ".log", base + "_history"
+
+
+def make_record(old, new, now):
+    changed, removed = state_diff(old, new)
+    return {"version": new.get("version", 0), "ts": now, "set": changed, "unset": removed}
+
+
+def apply_record(state, record):
+    state.update(record["set"])
+    for key in record["unset"]:
+        state.pop(key, None)
+
+
+def read_records(path):
+    # Yields (record, end_offset) for every complete record. Stops at the
+    # first torn or invalid line (a crash in the middle of an append).
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return
+            if not isinstance(record, dict) or "version" not in record:
+                return
+            offset += len(line)
+            yield record, offset
+
+
+def _fsync_directory(directory):
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class EventLog:
+    # Append-only log of state changes. Not thread-safe; StateStore only
+    # uses it from flush(), under its write lock.
+
+    def __init__(self, path, history_dir):
+        self.path = path
+        self.history_dir = history_dir
+        self.records = 0
+        self.size = 0
+        self._file = None
+
+    def replay(self, state):
+        # Applies every record newer than 'state' (the snapshot) and opens
+        # the log for appending. A torn last line is cut off so new
+        # records are not appended to garbage.
+        with LOG_REPLAY_SECONDS.time():
+            valid_size = 0
+            for record, valid_size in read_records(self.path):
+                self.records += 1
+                if record["version"] <= state.get("version", 0):
+                    continue
+                apply_record(state, record)
+                state["version"] = record["version"]
+
+        self._file = open(self.path, "ab")
+        if self._file.tell() != valid_size:
+            self._file.truncate(valid_size)
+        self.size = valid_size
+        return state
+
+    def append(self, record, fsync=False):
+        start = time.perf_counter()
+        data = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        self._file.write(data)
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+        self.records += 1
+        self.size += len(data)
+        LOG_APPEND_SECONDS.labels(fsync).observe(time.perf_counter() - start)
+
+    def rotate(self, version):
+        # Called after a snapshot containing 'version' was written and
+        # fsync'ed: appends the records to today's history file and
+        # empties the log. A crash in between only repeats records in the
+        # history (they carry their version); the snapshot already has them.
+        if not self.records:
+            return
+        os.makedirs(self.history_dir, exist_ok=True)
+        history_path = os.path.join(self.history_dir, time.strftime("%Y-%m-%d") + ".log")
+        created = not os.path.exists(history_path)
+
+        with open(self.path, "rb") as log, open(history_path, "ab") as history:
+            history.write(log.read(self.size))
+            history.flush()
+            os.fsync(history.fileno())
+        if created:
+            _fsync_directory(self.history_dir)
+
+        self._file.truncate(0)
+        os.fsync(self._file.fileno())
+        self.records = 0
+        self.size = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
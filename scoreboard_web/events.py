@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+
+from clocks import current_instant, read_clocks
+
+# Comment line sent to idle clients so proxies/browsers keep the stream open
+KEEPALIVE_INTERVAL = 15.0
+
+
+class EventHub:
+    # Fans state changes out to all Server-Sent Events clients of /events.
+    #
+    # publish() serializes the state and the clock values (evaluated at
+    # "clocks_ts") once; every connected client then just sends that
+    # string. Clients that are slower than the changes
+    # skip intermediate states and always get the newest one.
+
+    def __init__(self, keepalive=KEEPALIVE_INTERVAL):
+        self.keepalive = keepalive
+        self._changed = threading.Condition()
+        self._sequence = 0
+        self._payload = None
+        self._closed = False
+
+    def publish(self, state):
+        instant = current_instant()
+        clocks = read_clocks(state, instant)
+        payload = (
+            f'"clocks_ts":{int(instant.wall * 1000)},'
+            f'"clocks":{json.dumps(clocks, separators=(",", ":"))},'
+            f'"state":{json.dumps(state, separators=(",", ":"))}'
+        )
+        with self._changed:
+            self._sequence += 1
+            self._payload = payload
+            self._changed.notify_all()
+
+    def close(self):
+        # Ends all streams (on shutdown, so their workers become free)
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def _message(self, payload):
+        # server_ts lets clients correct for their own clock offset
+        server_ts = int(time.time() * 1000)
+        return f'data: {{"server_ts":{server_ts},{payload}}}\n\n'
+
+    def stream(self):
+        # Generator for a text/event-stream response
+        seen = None
+        while True:
+            with self._changed:
+                self._changed.wait_for(
+                    lambda: self._sequence != seen or self._closed, timeout=self.keepalive
+                )
+                if self._closed:
+                    return
+                sequence, payload = self._sequence, self._payload
+
+            if sequence == seen or payload is None:
+                yield ": keepalive\n\n"
+                continue
+
+            seen = sequence
+            yield self._message(payload)
+
+    def once(self, retry):
+        # The current state and "reconnect in 'retry' seconds", for clients
+        # that get no stream of their own (see MAX_EVENT_STREAMS in
+        # server.py): EventSource reconnects when the response ends, so
+        # they poll until a stream becomes free.
+        with self._changed:
+            payload = self._payload
+        message = f"retry: {int(retry * 1000)}\n\n"
+        if payload is not None:
+            message += self._message(payload)
+        return message
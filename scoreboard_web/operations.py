@@ -0,0 +1,131 @@
+import math
+import threading
+from collections import OrderedDict
+
+from clocks import DIRECTIONS, get_clock, reset_clock, start_clock, stop_clock
+
+# Number of idempotency keys remembered for retries
+MAX_REMEMBERED_KEYS = 1000
+
+# Longest accepted idempotency key
+MAX_KEY_LENGTH = 128
+
+CLOCK_ACTIONS = ("start", "stop", "reset")
+
+
+class OperationError(ValueError):
+    pass
+
+
+# --- Operations ---
+# A batch is a list of small operations:
+#   {"op": "score", "team": 0, "delta": 1}
+#   {"op": "rename", "team": 1, "name": "Gäste"}
+#   {"op": "color", "team": 0, "color": [91, 124, 255]}
+#   {"op": "clock", "clock": "game", "action": "start"}
+#   {"op": "clock", "clock": "timer", "action": "reset", "duration": 600}
+#   {"op": "clock", "clock": "shot", "action": "reset", "direction": "down", "duration": 30}
+# Clock names are free; a clock that does not exist yet is created.
+
+def _team_index(op, teams):
+    team = op.get("team")
+    if not isinstance(team, int) or isinstance(team, bool) or not 0 <= team < len(teams):
+        raise OperationError(f"invalid team: {team!r}")
+    return team
+
+
+def valid_duration(duration):
+    # A clock duration in seconds: a finite, non-negative number. JSON
+    # parsing accepts NaN and Infinity, which the state could not be sent
+    # or drawn with.
+    return (
+        isinstance(duration, (int, float)) and not isinstance(duration, bool)
+        and math.isfinite(duration) and duration >= 0
+    )
+
+
+def validate_operation(op, teams):
+    if not isinstance(op, dict):
+        raise OperationError("operation must be an object")
+
+    kind = op.get("op")
+    if kind == "score":
+        _team_index(op, teams)
+        delta = op.get("delta")
+        if not isinstance(delta, int) or isinstance(delta, bool):
+            raise OperationError(f"invalid delta: {delta!r}")
+    elif kind == "rename":
+        _team_index(op, teams)
+        if not isinstance(op.get("name"), str):
+            raise OperationError("name must be a string")
+    elif kind == "color":
+        _team_index(op, teams)
+        color = op.get("color")
+        if (
+            not isinstance(color, list) or len(color) != 3
+            or not all(isinstance(c, int) and 0 <= c <= 255 for c in color)
+        ):
+            raise OperationError(f"invalid color: {color!r}")
+    elif kind == "clock":
+        if not isinstance(op.get("clock"), str) or not op["clock"]:
+            raise OperationError(f"invalid clock: {op.get('clock')!r}")
+        if op.get("action") not in CLOCK_ACTIONS:
+            raise OperationError(f"invalid action: {op.get('action')!r}")
+        duration = op.get("duration")
+        if duration is not None and not valid_duration(duration):
+            raise OperationError(f"invalid duration: {duration!r}")
+        if op.get("direction", "up") not in DIRECTIONS:
+            raise OperationError(f"invalid direction: {op.get('direction')!r}")
+    else:
+        raise OperationError(f"unknown operation: {kind!r}")
+
+
+def apply_operations(state, ops, instant):
+    # Validates the whole batch first, then applies it. Either every
+    # operation is applied or (on OperationError) none.
+    if not isinstance(ops, list):
+        raise OperationError("ops must be a list")
+
+    teams = state.get("teams", [])
+    for op in ops:
+        validate_operation(op, teams)
+
+    for op in ops:
+        kind = op["op"]
+        if kind == "score":
+            team = teams[op["team"]]
+            team["score"] = max(0, team.get("score", 0) + op["delta"])
+        elif kind == "rename":
+            teams[op["team"]]["name"] = op["name"]
+        elif kind == "color":
+            teams[op["team"]]["color"] = op["color"]
+        elif kind == "clock":
+            clock = get_clock(state, op["clock"], op.get("direction", "up"))
+            if op["action"] == "start":
+                # Starting with a duration sets the clock to it first
+                if op.get("duration") is not None and not clock.get("running"):
+                    reset_clock(clock, op["duration"])
+                start_clock(clock, instant)
+            elif op["action"] == "stop":
+                stop_clock(clock, instant)
+            else:
+                reset_clock(clock, op.get("duration"), op.get("direction"))
+
+
+class IdempotencyCache:
+    # Remembers the response for the last MAX_REMEMBERED_KEYS idempotency
+    # keys, so a retried batch is answered without being applied again.
+    # 'lock' must be held around lookup + apply + remember.
+
+    def __init__(self, max_keys=MAX_REMEMBERED_KEYS):
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self._responses = OrderedDict()
+
+    def get(self, key):
+        return self._responses.get(key)
+
+    def remember(self, key, response):
+        self._responses[key] = response
+        while len(self._responses) > self.max_keys:
+            self._responses.popitem(last=False)
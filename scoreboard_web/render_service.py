@@ -0,0 +1,134 @@
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from clocks import current_instant, read_clocks
+from metrics import REGISTRY
+
+# The display's drawing code (../scoreboard)
+SCOREBOARD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scoreboard")
+
+RENDER_MODES = ("index", "scores_and_teams", "stopwatch", "timer", "message", "ticker")
+
+# Frames are drawn at the display's size (the font sizes are made for it)
+# and scaled to the requested size
+BASE_SIZE = (1920, 1080)
+MAX_SIZE = (3840, 2160)
+
+# Renderers (one full-size surface each) and scaled PNGs kept
+MAX_FRAMES = 8
+MAX_IMAGES = 32
+
+RENDER_SECONDS = REGISTRY.histogram(
+    "render_png_duration_seconds", "Time to answer a /render.png request", ("cache",)
+)
+
+
+class RenderService:
+    # Renders the scoreboard to PNG with the display's Renderer.
+    #
+    # There is one Renderer per (board, mode, transparent). Every request draws
+    # the current state into it, which is cheap: only changed widgets are
+    # redrawn and draw() reports whether anything changed. The PNG for a
+    # size is only scaled and encoded again when the frame changed (state
+    # or a visible clock), so many pollers of the same picture cost one
+    # encode per change. pygame is only imported on the first request.
+    # Drawing shares one lock (pygame fonts are not thread-safe), the PNG
+    # encoding runs outside of it.
+    #
+    # A frame's "sequence" comes from one counter for the whole service,
+    # so a renderer created again after eviction never reuses a number an
+    # older cached PNG was made from.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = OrderedDict()
+        self._images = OrderedDict()
+        self._sequence = 0
+        self._pygame = None
+        self._text_cache = None
+
+    def _init_pygame(self):
+        if self._pygame is not None:
+            return
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        if SCOREBOARD_DIR not in sys.path:
+            sys.path.append(SCOREBOARD_DIR)
+        import pygame
+        from render_cache import TextCache
+
+        pygame.font.init()
+        self._pygame = pygame
+        self._text_cache = TextCache()
+
+    def _next_sequence(self):
+        self._sequence += 1
+        return self._sequence
+
+    def _frame(self, board_id, mode, transparent):
+        # Renderer + surface + change counter for one (board, mode, transparent)
+        key = (board_id, mode, transparent)
+        frame = self._frames.get(key)
+        if frame is not None:
+            self._frames.move_to_end(key)
+        else:
+            from renderer import Renderer
+
+            pygame = self._pygame
+            flags = pygame.SRCALPHA if transparent else 0
+            frame = self._frames[key] = {
+                "renderer": Renderer(*BASE_SIZE, text_cache=self._text_cache, transparent=transparent),
+                "surface": pygame.Surface(BASE_SIZE, flags),
+                "sequence": self._next_sequence(),
+            }
+            while len(self._frames) > MAX_FRAMES:
+                evicted, _ = self._frames.popitem(last=False)
+                # Its PNGs can no longer be validated
+                for image_key in [k for k in self._images if k[:3] == evicted]:
+                    del self._images[image_key]
+        return frame
+
+    def render(self, board_id, state, mode, size, transparent=False):
+        # Returns (png bytes, etag) of 'state' shown in 'mode' at 'size'
+        start = time.perf_counter()
+        with self._lock:
+            self._init_pygame()
+            pygame = self._pygame
+            frame = self._frame(board_id, mode, transparent)
+
+            instant = current_instant()
+            state = dict(state, mode=mode)
+            if frame["renderer"].draw(frame["surface"], state, instant.wall, read_clocks(state, instant)):
+                frame["sequence"] = self._next_sequence()
+
+            key = (board_id, mode, transparent, size)
+            image = self._images.get(key)
+            if image is not None and image["sequence"] == frame["sequence"]:
+                self._images.move_to_end(key)
+                RENDER_SECONDS.labels("hit").observe(time.perf_counter() - start)
+                return image["png"], image["etag"]
+
+            sequence = frame["sequence"]
+            if size != BASE_SIZE:
+                surface = pygame.transform.smoothscale(frame["surface"], size)
+            else:
+                surface = frame["surface"].copy()
+
+        buffer = io.BytesIO()
+        pygame.image.save(surface, buffer, "render.png")
+        png = buffer.getvalue()
+        image = {"sequence": sequence, "png": png, "etag": hashlib.sha1(png).hexdigest()[:20]}
+
+        with self._lock:
+            # Another request may have stored a newer PNG meanwhile
+            cached = self._images.get(key)
+            if cached is None or cached["sequence"] < sequence:
+                self._images[key] = image
+            while len(self._images) > MAX_IMAGES:
+                self._images.popitem(last=False)
+        RENDER_SECONDS.labels("miss").observe(time.perf_counter() - start)
+        return png, image["etag"]
@@ -1,280 +1,601 @@
-from flask import Flask, jsonify, request, render_template, send_from_directory
-import json
+from flask import (
+    Blueprint, Flask, Response, abort, g, jsonify, request, render_template, send_from_directory
+)
+import argparse
+import copy
 import os
+import signal
+import sys
+import threading
 import time
-import subprocess
 
 # Absolute base directory of this file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Modules shared with the display (../shared)
+sys.path.insert(0, os.path.join(os.path.dirname(BASE_DIR), "shared"))
+
+from boards import BoardRegistry
+from cec import CecService, DEFAULT_CEC_CLIENT
+from clocks import (
+    current_instant, default_clocks, get_clock, legacy_clock_values, read_clocks, reset_clock,
+    start_clock, stop_clock,
+)
+from metrics import REGISTRY
+from operations import MAX_KEY_LENGTH, OperationError, apply_operations, valid_duration
+from render_service import BASE_SIZE, MAX_SIZE, RENDER_MODES, RenderService
+from state_file import DEFAULT_BOARD
+from tournament import MATCH_STATUSES, TournamentError, TournamentStore
+from wsgi_server import PooledWSGIServer, SHUTDOWN_TIMEOUT, WORKERS
+
 app = Flask(
     __name__,
     template_folder=os.path.join(BASE_DIR, "templates"),
     static_folder=os.path.join(BASE_DIR, "static")
 )
 
-STATE_FILE = os.path.join(BASE_DIR, "state.json")
+# State of the default board; other boards live in boards/<id>/ next to it
+STATE_FILE = os.environ.get("SCOREBOARD_STATE_FILE", os.path.join(BASE_DIR, "state.json"))
 
-# State Helpers
+# One persistent cec-client for TV power and HDMI switching
+cec = CecService(os.environ.get("CEC_CLIENT", DEFAULT_CEC_CLIENT))
 
-def load_state():
-    if not os.path.exists(STATE_FILE):
-        save_state({
-            "stopwatch_running": False,
-            "elapsed_ms": 0,
-            "last_start_ts": None,
-
-            "game_clock_running": False,
-            "game_elapsed_ms": 0,
-            "game_last_start_ts": None,
-
-            "mode": "index",
-            "message": "Nachricht"
-        })
-    with open(STATE_FILE, "r") as f:
-        return json.load(f)
-
-def save_state(state):
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f)
-
-def set_mode(mode, message=None):
-    state = load_state()
-    state["mode"] = mode
-    if message is not None:
-        state["message"] = message
-    save_state(state)
+# fsync policy for state.json: "always", "durable" or "never"
+STATE_FSYNC = os.environ.get("SCOREBOARD_FSYNC", "durable")
 
-# -------- API: State --------
-@app.route("/get_state")
-def get_state():
-    state = load_state()
+# "log": append changes to state.log and snapshot into STATE_FILE now and
+# then (keeps the match history in state_history/); "snapshot": rewrite
+# STATE_FILE on every change
+STATE_PERSISTENCE = os.environ.get("SCOREBOARD_PERSISTENCE", "log")
 
-    # If the clock is running → calculate current time
+# Ticker: messages per playlist, characters per message and the scroll
+# speed range in pixels per second
+MAX_TICKER_MESSAGES = 20
+MAX_TICKER_LENGTH = 500
+TICKER_SPEED = 240
+TICKER_SPEED_RANGE = (0, 2000)
 
-    if state["stopwatch_running"] and state.get("last_start_ts"):
-        now = int(time.time() * 1000)
-        state["current_elapsed_ms"] = (
-            state["elapsed_ms"] + (now - state["last_start_ts"])
-        )
-    else:
-        state["current_elapsed_ms"] = state["elapsed_ms"]
+# State Helpers
 
-    # Timer state for clients
-    if state.get("timer_running") and state.get("timer_start_ts"):
-        now_s = time.time()
-        elapsed = now_s - state["timer_start_ts"]
-        state["remaining_seconds"] = max(0, state.get("timer_duration", 0) - elapsed)
-    else:
-        state["remaining_seconds"] = state.get("timer_duration", 0)
-
-    # Game clock
-    if state.get("game_clock_running") and state.get("game_last_start_ts"):
-        now = int(time.time() * 1000)
-        state["game_current_elapsed_ms"] = (
-            state.get("game_elapsed_ms", 0)
-            + (now - state["game_last_start_ts"])
-        )
-    else:
-        state["game_current_elapsed_ms"] = state.get("game_elapsed_ms", 0)
+DEFAULT_STATE = {
+    # game clock, stopwatch and timer (see shared/clocks.py)
+    "clocks": default_clocks(),
+
+    "mode": "index",
+    "message": "Nachricht",
+    "ticker": {"messages": ["Nachricht"], "speed": TICKER_SPEED},
+    "teams": [
+        {"name": "Team 1", "score": 0, "color": [91, 124, 255]},
+        {"name": "Team 2", "score": 0, "color": [214, 76, 76]}
+    ]
+}
+
+# Every board (court) has its own in-memory state, persisted by its own
+# background writer. Changes are pushed to the board's displays over
+# its state.sock and to its web clients over /events.
+# SCOREBOARD_BOARDS lists the boards besides the default one, e.g.
+# "court2,court3"; their state lives in boards/<id>/.
+BOARD_IDS = [b.strip() for b in os.environ.get("SCOREBOARD_BOARDS", "").split(",") if b.strip()]
+boards = BoardRegistry(
+    STATE_FILE, DEFAULT_STATE, board_ids=BOARD_IDS,
+    fsync=STATE_FSYNC, persistence=STATE_PERSISTENCE
+)
 
-    return jsonify(state)
+# Teams, schedule and results of the tournament day (shared by all boards)
+TOURNAMENT_DB = os.environ.get(
+    "SCOREBOARD_TOURNAMENT_DB", os.path.join(os.path.dirname(STATE_FILE), "tournament.db")
+)
+tournament = TournamentStore(TOURNAMENT_DB)
+
+# PNG snapshots for OBS / web overlays (/render.png)
+render_service = RenderService()
+
+# Every /events stream holds a worker thread of the server for as long as
+# the page is open. Streams may use all but RESERVED_WORKERS of them, so
+# the control pages always get a worker; further clients poll (see
+# EventHub.once).
+HTTP_WORKERS = int(os.environ.get("SCOREBOARD_WORKERS", WORKERS))
+RESERVED_WORKERS = 8
+MAX_EVENT_STREAMS = max(1, HTTP_WORKERS - RESERVED_WORKERS)
+EVENT_POLL_INTERVAL = 5.0
+event_streams = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+
+# -------- Boards --------
+# All routes below exist for the default board ("/stopwatch") and for
+# every configured board ("/b/court2/stopwatch"); g.board is the board.
+# Unknown board ids get 404.
+board_pages = Blueprint("board", __name__)
+
+@board_pages.url_value_preprocessor
+def load_board(endpoint, values):
+    board_id = values.pop("board_id", DEFAULT_BOARD) if values else DEFAULT_BOARD
+    g.board = boards.get(board_id)
+    if g.board is None:
+        abort(404)
+
+@board_pages.context_processor
+def board_template_context():
+    # Templates prefix their links and API calls with board_prefix
+    return {"board_id": g.board.id, "board_prefix": g.board.url_prefix}
+
+# -------- Metrics --------
+REQUEST_SECONDS = REGISTRY.histogram(
+    "request_duration_seconds", "Time to handle a request", ("method", "route")
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request_time(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.labels(request.method, route).observe(time.perf_counter() - start)
+    return response
+
+@board_pages.route("/metrics")
+def metrics():
+    # Prometheus text format: server metrics plus the board display's export
+    text = REGISTRY.render()
+    try:
+        with open(g.board.display_metrics_file, "r") as f:
+            text += f.read()
+    except OSError:
+        pass
+    return Response(text, mimetype="text/plain; version=0.0.4")
+
+# -------- API: State --------
+@board_pages.route("/get_state")
+def get_state():
+    # Served from memory, no disk I/O. "clock_values" are the clocks
+    # evaluated now (elapsed/remaining seconds).
+    return jsonify(state_response(g.board.store.snapshot()))
+
+def state_response(state):
+    # The state with the clocks evaluated at one instant: "clock_values"
+    # plus the keys older clients read (stopwatch_running, elapsed_ms,
+    # current_elapsed_ms, remaining_seconds, ...)
+    instant = current_instant()
+    response = dict(state, clock_values=read_clocks(state, instant))
+    response.update(legacy_clock_values(state, instant))
+    return response
+
+# -------- API: Live state stream (Server-Sent Events) --------
+@board_pages.route("/events")
+def events():
+    # Pushes the state and the clock values on every change; clients
+    # interpolate running clocks locally from there.
+    hub = g.board.events
+    limited = event_streams.acquire(blocking=False)
+    response = Response(
+        hub.stream() if limited else hub.once(EVENT_POLL_INTERVAL),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    if limited:
+        # Runs when the response is closed: after the client disconnected
+        # or the hub was closed, and also if the body never ran (HEAD)
+        response.call_on_close(event_streams.release)
+    return response
+
+# -------- API: Rendered image --------
+# /render.png?mode=scores_and_teams&w=1920[&h=1080][&transparent=1]
+# Same picture as the display. Pollers should send If-None-Match: the
+# image only changes with the state or a visible clock.
+@board_pages.route("/render.png")
+def render_png():
+    board = g.board
+    state = board.store.snapshot()
+    mode = request.args.get("mode", state.get("mode", "index"))
+    if mode not in RENDER_MODES:
+        return f"mode must be one of {', '.join(RENDER_MODES)}", 400
+
+    width = request.args.get("w", BASE_SIZE[0], type=int)
+    height = request.args.get("h", width * BASE_SIZE[1] // BASE_SIZE[0], type=int)
+    if not (16 <= width <= MAX_SIZE[0] and 16 <= height <= MAX_SIZE[1]):
+        return f"size must be between 16x16 and {MAX_SIZE[0]}x{MAX_SIZE[1]}", 400
+    transparent = request.args.get("transparent", "0") in ("1", "true")
+
+    png, etag = render_service.render(board.id, state, mode, (width, height), transparent)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(png, mimetype="image/png")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 # -------- API: Scores_and_teams --------
-@app.route("/scoreboard/update", methods=["POST"])
+@board_pages.route("/scoreboard/update", methods=["POST"])
 def scoreboard_update():
     data = request.get_json()
     if not data:
         return "No data received", 400
 
-    state = load_state()
-    state["mode"] = "scores_and_teams"
-    state["teams"] = data.get("teams", state.get("teams", []))
-    save_state(state)
+    with g.board.store.mutate(durable=True) as state:
+        state["mode"] = "scores_and_teams"
+        state["teams"] = data.get("teams", state.get("teams", []))
 
     return jsonify({"status": "ok"})
 
-@app.route("/game_clock/toggle", methods=["POST"])
+# Batched operations with idempotency keys:
+#   POST /ops {"key": "phone-a-17", "ops": [{"op": "score", "team": 0, "delta": 1}]}
+# The whole batch is applied in one state change. A retried request with
+# the same key is answered from the cache instead of being applied twice.
+@board_pages.route("/ops", methods=["POST"])
+def apply_ops():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "error": "expected a JSON object"}), 400
+
+    key = data.get("key") or request.headers.get("Idempotency-Key")
+    if key is not None and (not isinstance(key, str) or len(key) > MAX_KEY_LENGTH):
+        return jsonify({
+            "status": "error",
+            "error": f"key must be a string of at most {MAX_KEY_LENGTH} characters",
+        }), 400
+    board = g.board
+    idempotency = board.idempotency
+
+    with idempotency.lock:
+        if key is not None:
+            cached = idempotency.get(key)
+            if cached is not None:
+                return jsonify(dict(cached, status="duplicate"))
+
+        try:
+            with board.store.mutate(durable=True) as state:
+                apply_operations(state, data.get("ops"), current_instant())
+                response = {
+                    "status": "ok",
+                    "version": state["version"],
+                    "teams": copy.deepcopy(state.get("teams", [])),
+                }
+        except OperationError as e:
+            return jsonify({"status": "error", "error": str(e)}), 400
+
+        if key is not None:
+            idempotency.remember(key, response)
+
+    return jsonify(response)
+
+def toggle_clock(clock):
+    if not clock["running"]:
+        start_clock(clock, current_instant())
+    else:
+        stop_clock(clock, current_instant())
+
+@board_pages.route("/game_clock/toggle", methods=["POST"])
 def game_clock_toggle():
-    state = load_state()
-    now = int(time.time() * 1000)
+    with g.board.store.mutate(durable=True) as state:
+        toggle_clock(get_clock(state, "game"))
 
-    if not state.get("game_clock_running"):
-        # Start
-        state["game_last_start_ts"] = now
-        state["game_clock_running"] = True
-    else:
-        # Stop
-        state["game_elapsed_ms"] = state.get("game_elapsed_ms", 0) + (
-            now - state["game_last_start_ts"]
-        )
-        state["game_last_start_ts"] = None
-        state["game_clock_running"] = False
-
-    save_state(state)
     return "", 204
 
-@app.route("/game_clock/reset", methods=["POST"])
+@board_pages.route("/game_clock/reset", methods=["POST"])
 def game_clock_reset():
-    state = load_state()
-
-    state["game_elapsed_ms"] = 0
-    state["game_clock_running"] = False
-    state["game_last_start_ts"] = None
+    with g.board.store.mutate(durable=True) as state:
+        reset_clock(get_clock(state, "game"))
 
-    save_state(state)
     return "", 204
 
 # -------- API: Stopwatch --------
-@app.route("/stopwatch/toggle", methods=["POST"])
+@board_pages.route("/stopwatch/toggle", methods=["POST"])
 def stopwatch_toggle():
-    state = load_state()
-    now = int(time.time() * 1000)
+    with g.board.store.mutate(durable=True) as state:
+        # ▶ Start / ■ Stop
+        toggle_clock(get_clock(state, "stopwatch"))
+        response = state_response(state)
+    return jsonify(response)
 
-    if not state["stopwatch_running"]:
-        # ▶ Start
-        state["stopwatch_running"] = True
-        state["last_start_ts"] = now
-    else:
-        # ■ Stop
-        state["stopwatch_running"] = False
-        if state.get("last_start_ts"):
-            state["elapsed_ms"] += now - state["last_start_ts"]
-        state["last_start_ts"] = None
-
-    save_state(state)
-    return jsonify(state)
-
-@app.route("/stopwatch/reset", methods=["POST"])
+@board_pages.route("/stopwatch/reset", methods=["POST"])
 def stopwatch_reset():
-    state = load_state()
-    state["stopwatch_running"] = False
-    state["elapsed_ms"] = 0
-    state["last_start_ts"] = None
-    save_state(state)
-    return jsonify(state)
+    with g.board.store.mutate(durable=True) as state:
+        reset_clock(get_clock(state, "stopwatch"))
+        response = state_response(state)
+    return jsonify(response)
 
 # -------- API: Timer --------
-@app.route("/timer/update", methods=["POST"])
+@board_pages.route("/timer/update", methods=["POST"])
 def timer_update():
-    data = request.json
-
-    try:
-        with open(STATE_FILE, "r") as f:
-            state = json.load(f)
-    except:
-        state = {}
-
-    now = time.time()
-
-    # Start timer
-    if data.get("running") is True:
-        # If the timer is already running, do nothing
-        if not state.get("timer_running", False):
-            state["timer_start_ts"] = now
-            # If a duration is provided, set a new duration
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "error": "expected a JSON object"}), 400
+    duration = data.get("duration")
+    if "duration" in data and not valid_duration(duration):
+        return jsonify({"status": "error", "error": f"invalid duration: {duration!r}"}), 400
+
+    with g.board.store.mutate(durable=True) as state:
+        timer = get_clock(state, "timer")
+
+        # Start timer
+        if data.get("running") is True:
+            # If the timer is already running, do nothing
+            if not timer["running"]:
+                # If a duration is provided, count down from there
+                if "duration" in data:
+                    reset_clock(timer, data["duration"])
+                start_clock(timer, current_instant())
+
+        # Stop timer
+        elif data.get("running") is False:
+            stop_clock(timer, current_instant())
+            # If a duration is provided (preset or manual input)
             if "duration" in data:
-                state["timer_duration"] = data["duration"]
-            state["timer_running"] = True
-
-    # Stop timer
-    elif data.get("running") is False:
-        if state.get("timer_running") and state.get("timer_start_ts"):
-            elapsed = now - state["timer_start_ts"]
-            state["timer_duration"] = max(0, state.get("timer_duration", 0) - elapsed)
-        state["timer_start_ts"] = None
-        state["timer_running"] = False
-        # If a duration is provided (preset or manual input)
-        if "duration" in data:
-            state["timer_duration"] = data["duration"]
-
-    # Only set duration (preset or manual), timer is not running
-    elif "duration" in data:
-        state["timer_duration"] = data["duration"]
-        state["timer_running"] = False
-        state["timer_start_ts"] = None
-
-    state["mode"] = "timer"
-
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f)
+                reset_clock(timer, data["duration"])
+
+        # Only set duration (preset or manual), timer is not running
+        elif "duration" in data:
+            reset_clock(timer, data["duration"])
+
+        state["mode"] = "timer"
 
     return "", 204
 
 # -------- API: TV --------
-@app.route("/tv/<action>")
+# CEC commands are queued to a long-lived cec-client; the handlers return
+# right away with the job (poll /cec/jobs/<id> for its status).
+CEC_COMMANDS = {
+    "on": "on 0",
+    "off": "standby 0",
+}
+HDMI_COMMANDS = {
+    1: "tx 10:44:82:10:00",
+    2: "tx 10:44:82:20:00",
+}
+
+@board_pages.route("/tv/<action>")
 def tv_control(action):
-    if action == "on":
-        subprocess.run('echo "on 0" | cec-client -s -d 1', shell=True)
-    elif action == "off":
-        subprocess.run('echo "standby 0" | cec-client -s -d 1', shell=True)
-    return "", 204
+    if action not in CEC_COMMANDS:
+        return "", 204
+    job = cec.submit(CEC_COMMANDS[action])
+    return jsonify({"status": "queued", "job": job}), 202
+
+@board_pages.route("/cec/jobs/<int:job_id>")
+def cec_job(job_id):
+    job = cec.job(job_id)
+    if job is None:
+        return "Unknown job", 404
+    return jsonify(job)
 
 # -------- API: HDMI --------
-@app.route("/hdmi/<int:port>")
+@board_pages.route("/hdmi/<int:port>")
 def switch_hdmi(port):
-    state = load_state()
-    state['hdmi'] = port
-    save_state(state)
+    with g.board.store.mutate() as state:
+        state['hdmi'] = port
 
-    if port == 1:
-        subprocess.run('echo "tx 10:44:82:10:00" | cec-client -s -d 1', shell=True)
-    elif port == 2:
-        subprocess.run('echo "tx 10:44:82:20:00" | cec-client -s -d 1', shell=True)
+    job = None
+    if port in HDMI_COMMANDS:
+        job = cec.submit(HDMI_COMMANDS[port])
 
-    return jsonify({"status": "ok", "hdmi": port})
+    return jsonify({"status": "ok", "hdmi": port, "job": job})
 
-@app.route("/hdmi/status")
+@board_pages.route("/hdmi/status")
 def hdmi_status():
-    state = load_state()
+    state = g.board.store.snapshot()
     return jsonify({"hdmi": state.get("hdmi", 1)})
 # Pages
 
-@app.route("/")
+@board_pages.route("/")
 def index_page():
-    set_mode("index")
+    g.board.set_mode("index")
     return render_template("index.html")
 
-@app.route("/scores_and_teams")
+@board_pages.route("/scores_and_teams")
 def scores_and_teams_page():
-    state = load_state()
-    set_mode("scores_and_teams")
+    state = g.board.store.snapshot()
+    g.board.set_mode("scores_and_teams")
     return render_template(
         "scores_and_teams.html",
         team1=state["teams"][0],
         team2=state["teams"][1]
     )
 
-@app.route("/stopwatch")
+@board_pages.route("/stopwatch")
 def stopwatch_page():
-    set_mode("stopwatch")
+    g.board.set_mode("stopwatch")
     return render_template("stopwatch.html")
 
-@app.route("/timer")
+@board_pages.route("/timer")
 def timer_page():
-    try:
-        with open("state.json", "r") as f:
-            state = json.load(f)
-    except:
-        state = {}
-
-    state["mode"] = "timer"
-
-    with open("state.json", "w") as f:
-        json.dump(state, f)
-
+    g.board.set_mode("timer")
     return render_template("timer.html")
 
-@app.route("/message", methods=["GET", "POST"])
+@board_pages.route("/message", methods=["GET", "POST"])
 def message_page():
     if request.method == "POST":
         msg = request.form.get("message", "").strip()
         if not msg:
             msg = "Nachricht"
-        set_mode("message", msg)
+        g.board.set_mode("message", msg)
     else:
-        set_mode("message")
+        g.board.set_mode("message")
     return render_template("message.html")
 
+@board_pages.route("/ticker", methods=["GET", "POST"])
+def ticker_page():
+    # POST replaces the playlist (one message per line) and starts it
+    # from the beginning; GET shows the current one again
+    instant = current_instant()
+    with g.board.store.mutate() as state:
+        state["mode"] = "ticker"
+        clock = get_clock(state, "ticker")
+        if request.method == "POST":
+            lines = request.form.get("messages", "").splitlines()
+            messages = [line.strip()[:MAX_TICKER_LENGTH] for line in lines if line.strip()]
+            try:
+                speed = int(request.form.get("speed", TICKER_SPEED))
+            except ValueError:
+                speed = TICKER_SPEED
+            low, high = TICKER_SPEED_RANGE
+            state["ticker"] = {
+                "messages": messages[:MAX_TICKER_MESSAGES] or ["Nachricht"],
+                "speed": min(max(speed, low), high),
+            }
+            reset_clock(clock)
+        start_clock(clock, instant)
+    return render_template("message.html")
+
+# -------- Tournament --------
+# Teams and matches are entered ahead of the day; a board loads the next
+# match with one call and stores the result when it ends. During the
+# match only the board's in-memory state changes.
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _valid_player(player):
+    return (
+        isinstance(player, dict)
+        and isinstance(player.get("name"), str) and player["name"].strip() != ""
+        and (player.get("number") is None or _is_int(player["number"]))
+    )
+
+@app.route("/tournament/teams", methods=["GET", "POST"])
+def tournament_teams():
+    if request.method == "GET":
+        return jsonify({"teams": tournament.teams()})
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("name"), str) or not data["name"].strip():
+        return jsonify({"status": "error", "error": "expected {\"name\": ...}"}), 400
+    color = data.get("color", [80, 80, 80])
+    players = data.get("players", [])
+    if (not isinstance(color, list) or len(color) != 3
+            or not all(_is_int(c) and 0 <= c <= 255 for c in color)):
+        return jsonify({"status": "error", "error": "color must be [r, g, b]"}), 400
+    if not isinstance(players, list) or not all(_valid_player(p) for p in players):
+        return jsonify({
+            "status": "error", "error": "players must be [{\"name\": ..., \"number\": int or null}]"
+        }), 400
+    try:
+        team = tournament.add_team(data["name"].strip(), color, players)
+    except TournamentError as e:
+        return jsonify({"status": "error", "error": str(e)}), 409
+    return jsonify({"status": "ok", "team": team}), 201
+
+@app.route("/tournament/teams/<int:team_id>")
+def tournament_team(team_id):
+    team = tournament.team(team_id)
+    if team is None:
+        return jsonify({"status": "error", "error": "unknown team"}), 404
+    return jsonify(dict(team, results=tournament.team_results(team_id)))
+
+@app.route("/tournament/matches", methods=["GET", "POST"])
+def tournament_matches():
+    if request.method == "GET":
+        status = request.args.get("status")
+        if status is not None and status not in MATCH_STATUSES:
+            return jsonify({"status": "error", "error": "unknown status"}), 400
+        return jsonify({"matches": tournament.matches(status)})
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "error": "expected a JSON object"}), 400
+    teams = data.get("teams")
+    if not isinstance(teams, list) or len(teams) != 2 or not all(_is_int(t) for t in teams):
+        return jsonify({"status": "error", "error": "teams must be [team1_id, team2_id]"}), 400
+    round_name = data.get("round")
+    if round_name is not None and not isinstance(round_name, str):
+        return jsonify({"status": "error", "error": "round must be a string"}), 400
+    board_id = data.get("board")
+    if board_id is not None and board_id not in boards.ids():
+        return jsonify({
+            "status": "error", "error": f"board must be one of {', '.join(boards.ids())}"
+        }), 400
+    try:
+        match = tournament.add_match(teams[0], teams[1], round_name, board_id)
+    except TournamentError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    return jsonify({"status": "ok", "match": match}), 201
+
+@board_pages.route("/tournament/next", methods=["POST"])
+def tournament_next_match():
+    # Loads the next scheduled match into this board: team names and
+    # colors, scores 0 and a stopped game clock at zero
+    board = g.board
+    if board.store.snapshot().get("match") is not None:
+        return jsonify({"status": "error", "error": "a match is still running on this board"}), 409
+
+    try:
+        match = tournament.start_next_match(board.id)
+    except TournamentError as e:
+        return jsonify({"status": "error", "error": str(e)}), 409
+    if match is None:
+        return jsonify({"status": "error", "error": "no scheduled match"}), 404
+
+    with board.store.mutate(durable=True) as state:
+        state["teams"] = [
+            {"name": team["name"], "score": 0, "color": team["color"]} for team in match["teams"]
+        ]
+        state["match"] = {"id": match["id"], "round": match["round"]}
+        reset_clock(get_clock(state, "game"))
+        state["mode"] = "scores_and_teams"
+    return jsonify({"status": "ok", "match": match})
+
+@board_pages.route("/tournament/finish", methods=["POST"])
+def tournament_finish_match():
+    # Stores the board's current scores and game time as the result of
+    # its match and frees the board for the next one
+    board = g.board
+    instant = current_instant()
+    state = board.store.snapshot()
+    live = state.get("match")
+    if live is None:
+        return jsonify({"status": "error", "error": "no match on this board"}), 409
+    score = [team.get("score", 0) for team in state["teams"][:2]]
+    duration = read_clocks(state, instant)["game"]["elapsed"]
+
+    # The result is in the database before the board lets go of the match
+    if not tournament.finish_match(live["id"], score, duration):
+        return jsonify({"status": "error", "error": "match is not live"}), 409
+    with board.store.mutate(durable=True) as state:
+        state.pop("match", None)
+        stop_clock(get_clock(state, "game"), instant)
+    return jsonify({"status": "ok", "match": tournament.match(live["id"])})
+
+app.register_blueprint(board_pages)
+app.register_blueprint(board_pages, url_prefix="/b/<board_id>", name="named_board")
+
+# -------- Serving --------
+def shutdown():
+    # Flushes pending state writes and stops the background workers
+    boards.close()
+    tournament.close()
+    cec.close()
+
+def serve(host, port, workers=HTTP_WORKERS):
+    # Production server (see wsgi_server.py). SIGTERM / Ctrl+C stop
+    # accepting connections, end the /events streams, let running
+    # requests finish and flush every board's state before exiting.
+    server = PooledWSGIServer(host, port, app, workers=workers)
+
+    def stop(signum, frame):
+        server.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"Scoreboard on http://{host}:{port} ({workers} workers)", flush=True)
+    server.serve_forever()
+
+    boards.end_streams()
+    unfinished = server.drain(SHUTDOWN_TIMEOUT)
+    if unfinished:
+        print(f"{unfinished} requests still running at shutdown", file=sys.stderr)
+    shutdown()
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+    parser = argparse.ArgumentParser(description="Scoreboard web server")
+    parser.add_argument("--host", default=os.environ.get("SCOREBOARD_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SCOREBOARD_PORT", "5000")))
+    parser.add_argument(
+        "--dev", action="store_true", help="Werkzeug development server (a thread per request)"
+    )
+    args = parser.parse_args()
+
+    if args.dev:
+        app.run(host=args.host, port=args.port, threaded=True)
+    else:
+        serve(args.host, args.port)
@@ -0,0 +1,178 @@
+import atexit
+import copy
+import threading
+import time
+from contextlib import contextmanager
+
+from event_log import EventLog, log_paths, make_record
+from state_file import read_state, write_state
+
+# When the state file is fsync'ed:
+#   "always"  - on every write
+#   "durable" - only when a pending mutation was marked durable
+#               (scores, clock start/stop) and on shutdown
+#   "never"   - only on shutdown
+FSYNC_MODES = ("always", "durable", "never")
+
+# How changes are persisted:
+#   "snapshot" - every flush rewrites the whole state file
+#   "log"      - every flush appends the changed keys to the event log;
+#                the state file is only rewritten as a snapshot when the
+#                log reaches SNAPSHOT_RECORDS records or SNAPSHOT_BYTES,
+#                and on shutdown
+PERSISTENCE_MODES = ("snapshot", "log")
+SNAPSHOT_RECORDS = 500
+SNAPSHOT_BYTES = 1024 * 1024
+
+
+class StateStore:
+    # Keeps the scoreboard state in memory behind a lock.
+    #
+    # Every mutation runs inside mutate(), so concurrent requests can no
+    # longer overwrite each other's changes. The state file is written by a
+    # single background thread ("write-behind"): a burst of mutations
+    # within flush_delay seconds results in only one write.
+    #
+    # Every mutation bumps state["version"], so readers of the file can
+    # tell a changed state from an unchanged one. on_change(state) is
+    # called under the lock after every mutation (it must not keep or
+    # modify 'state').
+    #
+    # With persistence="log" the state file is only a snapshot; the
+    # current state is the snapshot plus the event log (see event_log.py).
+    # Displays get every change over the state socket, so they do not
+    # depend on the file being current.
+
+    def __init__(self, path, defaults, flush_delay=0.05, fsync="durable", on_change=None,
+                 persistence="snapshot"):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"fsync must be one of {FSYNC_MODES}, not {fsync!r}")
+        if persistence not in PERSISTENCE_MODES:
+            raise ValueError(
+                f"persistence must be one of {PERSISTENCE_MODES}, not {persistence!r}"
+            )
+
+        self.path = path
+        self.flush_delay = flush_delay
+        self.fsync = fsync
+        self.on_change = on_change
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._dirty = False
+        self._durable = False
+        self._closed = False
+        self._log = None
+        self._state = self._read(defaults, persistence)
+        # Last state handed to the writer (the base of the next log record)
+        self._persisted = copy.deepcopy(self._state)
+
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="state-flusher", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _read(self, defaults, persistence):
+        state = read_state(self.path)
+        missing = state is None
+        if missing:
+            state = copy.deepcopy(defaults)
+
+        if persistence == "log":
+            self._log = EventLog(*log_paths(self.path))
+            state = self._log.replay(state)
+
+        if missing:
+            write_state(self.path, state, fsync=True)
+        return state
+
+    # --- Access ---
+    def snapshot(self):
+        # Returns a private copy of the current state (no disk I/O)
+        with self._lock:
+            return copy.deepcopy(self._state)
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._state.get("version", 0)
+
+    @contextmanager
+    def mutate(self, durable=False):
+        # with store.mutate() as state: state["mode"] = "index"
+        # The block runs under the lock, the change is persisted afterwards.
+        # durable=True requests an fsync for the write that contains it.
+        # Inside the block state["version"] is already the new version.
+        # The block works on a copy that replaces the state only if it
+        # completes: an exception leaves the state (and version) unchanged.
+        with self._lock:
+            state = copy.deepcopy(self._state)
+            state["version"] = state.get("version", 0) + 1
+            yield state
+            self._state = state
+            self._dirty = True
+            self._durable = self._durable or durable
+            self._changed.notify()
+            if self.on_change is not None:
+                self.on_change(self._state)
+
+    # --- Persistence ---
+    def flush(self, fsync=None):
+        # Only one writer at a time; the copy is taken inside the write lock
+        # so an older snapshot can never be written after a newer one.
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = copy.deepcopy(self._state)
+                if fsync is None:
+                    fsync = self.fsync == "always" or (
+                        self.fsync == "durable" and self._durable
+                    )
+                self._dirty = False
+                self._durable = False
+
+            if self._log is None:
+                write_state(self.path, data, fsync=fsync)
+            else:
+                self._log.append(make_record(self._persisted, data, time.time()), fsync=fsync)
+                if self._log.records >= SNAPSHOT_RECORDS or self._log.size >= SNAPSHOT_BYTES:
+                    self._snapshot(data)
+            self._persisted = data
+
+    def _snapshot(self, data):
+        # Caller holds the write lock. The snapshot must be on disk before
+        # the log it replaces is moved away.
+        write_state(self.path, data, fsync=True)
+        self._log.rotate(data.get("version", 0))
+
+    def compact(self):
+        # Writes a snapshot of everything logged so far and starts a new log
+        if self._log is None:
+            return
+        with self._write_lock:
+            if self._log.records:
+                self._snapshot(self._persisted)
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while not self._dirty and not self._closed:
+                    self._changed.wait()
+                if self._closed:
+                    return
+
+            # Let a burst of mutations settle, then write once
+            time.sleep(self.flush_delay)
+            self.flush()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._changed.notify()
+        self.flush(fsync=True)
+        if self._log is not None:
+            self.compact()
+            with self._write_lock:
+                self._log.close()
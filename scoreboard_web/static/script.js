@@ -0,0 +1,67 @@
+// --- Live state from the server (Server-Sent Events on /events) ---
+
+// Difference between the server clock and this device's clock (ms)
+let serverOffsetMs = 0;
+
+// Current time on the server clock (ms since epoch)
+function serverNow() {
+    return Date.now() + serverOffsetMs;
+}
+
+// Elapsed seconds of a clock value (from the "clocks" of an event) now.
+// Count-downs stop at their duration.
+function clockElapsed(clock) {
+    let elapsed = clock.elapsed;
+    if (clock.running) {
+        elapsed += (serverNow() - clock.at) / 1000;
+    }
+    if (clock.direction === "down") {
+        elapsed = Math.min(elapsed, clock.duration);
+    }
+    return elapsed;
+}
+
+// Calls onState(state, clocks) with the full state and the clock values
+// (by name, see clockElapsed) on every change.
+// EventSource reconnects by itself if the connection drops.
+function subscribeState(onState) {
+    const source = new EventSource(BOARD_PREFIX + "/events");
+
+    source.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        serverOffsetMs = data.server_ts - Date.now();
+        for (const clock of Object.values(data.clocks)) {
+            clock.at = data.clocks_ts;
+        }
+        onState(data.state, data.clocks);
+    };
+
+    return source;
+}
+
+// --- Batched operations (POST /ops) ---
+
+// Random id for this page load; with a counter it forms the idempotency key
+const opsClientId = Math.random().toString(36).slice(2, 10);
+let opsSequence = 0;
+
+// Sends a batch like [{op: "score", team: 0, delta: 1}]. Failed requests
+// are retried with the same key, so the server never applies it twice.
+function sendOps(ops, retries = 5) {
+    const key = opsClientId + "-" + (++opsSequence);
+    const body = JSON.stringify({ key: key, ops: ops });
+
+    function attempt(left) {
+        return fetch(BOARD_PREFIX + "/ops", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: body
+        }).then(res => res.json()).catch(err => {
+            if (left <= 0) throw err;
+            return new Promise(resolve => setTimeout(resolve, 500))
+                .then(() => attempt(left - 1));
+        });
+    }
+
+    return attempt(retries);
+}
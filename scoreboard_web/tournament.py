@@ -0,0 +1,268 @@
+import contextlib
+import json
+import queue
+import sqlite3
+import time
+
+from metrics import REGISTRY
+
+# Teams, rosters, the match schedule and results of a tournament day, in
+# SQLite. Only things that must survive the day live here: the live
+# scores and clocks of a running match stay in the board's in-memory
+# state and are written to the database once, when the match ends.
+#
+# WAL mode lets the request threads read while another one writes. The
+# connections are pooled (the server starts a thread per request), and
+# sqlite3 keeps the prepared statements of a connection: the SQL below is
+# fixed and values are always parameters, so each statement is compiled
+# once per connection.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS teams (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    color TEXT NOT NULL              -- JSON [r, g, b]
+);
+
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    team_id INTEGER NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    number INTEGER
+);
+CREATE INDEX IF NOT EXISTS players_by_team ON players(team_id);
+
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,       -- order of play
+    round TEXT,
+    board TEXT,                      -- board (court) to play on, NULL: any
+    team1_id INTEGER NOT NULL REFERENCES teams(id),
+    team2_id INTEGER NOT NULL REFERENCES teams(id),
+    status TEXT NOT NULL DEFAULT 'scheduled',   -- scheduled, live, finished
+    score1 INTEGER,
+    score2 INTEGER,
+    duration REAL,                   -- game clock at the end, in seconds
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS matches_by_status ON matches(status, position);
+CREATE INDEX IF NOT EXISTS matches_by_team1 ON matches(team1_id);
+CREATE INDEX IF NOT EXISTS matches_by_team2 ON matches(team2_id);
+"""
+
+MATCH_STATUSES = ("scheduled", "live", "finished")
+
+# Connections kept open for reuse
+POOL_SIZE = 4
+
+# --- Statements ---
+INSERT_TEAM = "INSERT INTO teams (name, color) VALUES (?, ?)"
+INSERT_PLAYER = "INSERT INTO players (team_id, name, number) VALUES (?, ?, ?)"
+SELECT_TEAMS = "SELECT id, name, color FROM teams ORDER BY name"
+SELECT_TEAM = "SELECT id, name, color FROM teams WHERE id = ?"
+SELECT_PLAYERS = "SELECT name, number FROM players WHERE team_id = ? ORDER BY number, name"
+
+INSERT_MATCH = """
+INSERT INTO matches (position, round, board, team1_id, team2_id)
+VALUES ((SELECT COALESCE(MAX(position), 0) + 1 FROM matches), ?, ?, ?, ?)
+"""
+MATCH_COLUMNS = """
+SELECT m.id, m.position, m.round, m.board, m.status, m.score1, m.score2,
+       m.duration, m.started_at, m.finished_at,
+       t1.id, t1.name, t1.color, t2.id, t2.name, t2.color
+FROM matches m
+JOIN teams t1 ON t1.id = m.team1_id
+JOIN teams t2 ON t2.id = m.team2_id
+"""
+SELECT_MATCHES = MATCH_COLUMNS + "ORDER BY m.position"
+SELECT_MATCHES_BY_STATUS = MATCH_COLUMNS + "WHERE m.status = ? ORDER BY m.position"
+SELECT_MATCH = MATCH_COLUMNS + "WHERE m.id = ?"
+SELECT_LIVE_MATCH = MATCH_COLUMNS + "WHERE m.status = 'live' AND m.board = ?"
+SELECT_LIVE_MATCH_ID = "SELECT id FROM matches WHERE status = 'live' AND board = ?"
+SELECT_NEXT_MATCH_ID = """
+SELECT id FROM matches
+WHERE status = 'scheduled' AND (board IS NULL OR board = ?)
+ORDER BY position LIMIT 1
+"""
+START_MATCH = "UPDATE matches SET status = 'live', board = ?, started_at = ? WHERE id = ?"
+FINISH_MATCH = """
+UPDATE matches SET status = 'finished', score1 = ?, score2 = ?, duration = ?, finished_at = ?
+WHERE id = ? AND status = 'live'
+"""
+SELECT_TEAM_RESULTS = MATCH_COLUMNS + """
+WHERE m.status = 'finished' AND (m.team1_id = ? OR m.team2_id = ?)
+ORDER BY m.position
+"""
+
+QUERY_SECONDS = REGISTRY.histogram(
+    "tournament_query_duration_seconds", "Time of a tournament database call", ("call",)
+)
+
+
+class TournamentError(ValueError):
+    pass
+
+
+def _match(row):
+    (match_id, position, round_name, board, status, score1, score2,
+     duration, started_at, finished_at,
+     team1_id, team1_name, team1_color, team2_id, team2_name, team2_color) = row
+    return {
+        "id": match_id,
+        "position": position,
+        "round": round_name,
+        "board": board,
+        "status": status,
+        "score": None if score1 is None else [score1, score2],
+        "duration": duration,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "teams": [
+            {"id": team1_id, "name": team1_name, "color": json.loads(team1_color)},
+            {"id": team2_id, "name": team2_name, "color": json.loads(team2_color)},
+        ],
+    }
+
+
+class TournamentStore:
+    # Access to the tournament database, shared by all request threads
+
+    def __init__(self, path, pool_size=POOL_SIZE):
+        self.path = path
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+        with self._connection() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        # Autocommit; multi-statement changes use explicit transactions
+        db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None,
+                             check_same_thread=False, cached_statements=64)
+        db.execute("PRAGMA foreign_keys=ON")
+        # Results are written a few times per hour: make every commit durable
+        db.execute("PRAGMA synchronous=FULL")
+        return db
+
+    @contextlib.contextmanager
+    def _connection(self):
+        try:
+            db = self._pool.get_nowait()
+        except queue.Empty:
+            db = self._connect()
+        try:
+            yield db
+        finally:
+            try:
+                self._pool.put_nowait(db)
+            except queue.Full:
+                db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two boards
+        # cannot claim the same match
+        with self._connection() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    # --- Teams ---
+    def add_team(self, name, color, players=()):
+        # players: [{"name": ..., "number": ...}]
+        try:
+            with QUERY_SECONDS.labels("add_team").time(), self._transaction() as db:
+                team_id = db.execute(INSERT_TEAM, (name, json.dumps(list(color)))).lastrowid
+                db.executemany(INSERT_PLAYER, [
+                    (team_id, player["name"], player.get("number")) for player in players
+                ])
+        except sqlite3.IntegrityError:
+            raise TournamentError(f"team {name!r} already exists")
+        return self.team(team_id)
+
+    def team(self, team_id):
+        with QUERY_SECONDS.labels("team").time(), self._connection() as db:
+            row = db.execute(SELECT_TEAM, (team_id,)).fetchone()
+            if row is None:
+                return None
+            players = db.execute(SELECT_PLAYERS, (team_id,)).fetchall()
+        return {
+            "id": row[0],
+            "name": row[1],
+            "color": json.loads(row[2]),
+            "players": [{"name": name, "number": number} for name, number in players],
+        }
+
+    def teams(self):
+        with QUERY_SECONDS.labels("teams").time(), self._connection() as db:
+            rows = db.execute(SELECT_TEAMS).fetchall()
+        return [{"id": row[0], "name": row[1], "color": json.loads(row[2])} for row in rows]
+
+    # --- Matches ---
+    def add_match(self, team1_id, team2_id, round_name=None, board=None):
+        if team1_id == team2_id:
+            raise TournamentError("a team cannot play against itself")
+        try:
+            with QUERY_SECONDS.labels("add_match").time(), self._transaction() as db:
+                match_id = db.execute(INSERT_MATCH, (round_name, board, team1_id, team2_id)).lastrowid
+        except sqlite3.IntegrityError:
+            raise TournamentError("unknown team")
+        return self.match(match_id)
+
+    def match(self, match_id):
+        with QUERY_SECONDS.labels("match").time(), self._connection() as db:
+            row = db.execute(SELECT_MATCH, (match_id,)).fetchone()
+        return None if row is None else _match(row)
+
+    def matches(self, status=None):
+        with QUERY_SECONDS.labels("matches").time(), self._connection() as db:
+            if status is None:
+                rows = db.execute(SELECT_MATCHES).fetchall()
+            else:
+                rows = db.execute(SELECT_MATCHES_BY_STATUS, (status,)).fetchall()
+        return [_match(row) for row in rows]
+
+    def live_match(self, board):
+        with QUERY_SECONDS.labels("live_match").time(), self._connection() as db:
+            row = db.execute(SELECT_LIVE_MATCH, (board,)).fetchone()
+        return None if row is None else _match(row)
+
+    def start_next_match(self, board):
+        # Marks the next scheduled match for 'board' (or for any board) as
+        # live on 'board' and returns it; None if nothing is scheduled.
+        # A board plays one match at a time: if it already has a live one,
+        # TournamentError. The check is in the same transaction as the
+        # claim, so of two simultaneous requests for a board only one wins.
+        with QUERY_SECONDS.labels("start_next_match").time(), self._transaction() as db:
+            live = db.execute(SELECT_LIVE_MATCH_ID, (board,)).fetchone()
+            if live is not None:
+                raise TournamentError(f"match {live[0]} is still live on board {board!r}")
+            row = db.execute(SELECT_NEXT_MATCH_ID, (board,)).fetchone()
+            if row is not None:
+                db.execute(START_MATCH, (board, time.time(), row[0]))
+        return None if row is None else self.match(row[0])
+
+    def finish_match(self, match_id, score, duration):
+        # Stores the result of a live match; False if it is not live
+        with QUERY_SECONDS.labels("finish_match").time(), self._connection() as db:
+            cursor = db.execute(
+                FINISH_MATCH, (score[0], score[1], duration, time.time(), match_id)
+            )
+        return cursor.rowcount == 1
+
+    def team_results(self, team_id):
+        with QUERY_SECONDS.labels("team_results").time(), self._connection() as db:
+            rows = db.execute(SELECT_TEAM_RESULTS, (team_id, team_id)).fetchall()
+        return [_match(row) for row in rows]
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
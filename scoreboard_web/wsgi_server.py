@@ -0,0 +1,82 @@
+import concurrent.futures
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from metrics import REGISTRY
+
+# Production server for server.py: Werkzeug's HTTP handling, but the
+# connections are handled by a fixed pool of worker threads instead of a
+# new thread per connection. A burst of requests (or a slow client) then
+# waits for a free worker instead of starting threads without limit, and
+# shutdown can wait for the requests that are still running.
+
+# Worker threads; long-lived /events streams each hold one
+WORKERS = 32
+
+# Connections the kernel queues before accept()
+LISTEN_BACKLOG = 128
+
+# Idle keep-alive connections are closed after this many seconds, so they
+# do not hold a worker forever. Also the timeout for a single send.
+KEEPALIVE_TIMEOUT = 5.0
+
+# How long shutdown waits for running requests
+SHUTDOWN_TIMEOUT = 10.0
+
+QUEUE_SECONDS = REGISTRY.histogram(
+    "http_queue_wait_seconds", "Time a connection waited for a free worker"
+)
+
+
+class RequestHandler(WSGIRequestHandler):
+    timeout = KEEPALIVE_TIMEOUT
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    # serve_forever() accepts connections on the calling thread and hands
+    # each one to the pool. Stop it with stop() (also from a signal
+    # handler), then drain() to let running requests finish.
+
+    multithread = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, host, port, app, workers=WORKERS):
+        super().__init__(host, port, app, handler=RequestHandler)
+        self.workers = workers
+        self._pool = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="http")
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        future = self._pool.submit(self._handle, request, client_address, time.perf_counter())
+        with self._lock:
+            self._running.add(future)
+        future.add_done_callback(self._done)
+
+    def _handle(self, request, client_address, accepted):
+        QUEUE_SECONDS.observe(time.perf_counter() - accepted)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def _done(self, future):
+        with self._lock:
+            self._running.discard(future)
+
+    def stop(self):
+        # shutdown() waits for serve_forever() to return, so it must not
+        # run on the thread that serves (e.g. in a signal handler)
+        threading.Thread(target=self.shutdown, name="http-stop").start()
+
+    def drain(self, timeout=SHUTDOWN_TIMEOUT):
+        # Waits for running requests; returns how many did not finish
+        with self._lock:
+            running = set(self._running)
+        _, not_done = concurrent.futures.wait(running, timeout=timeout)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        return len(not_done)
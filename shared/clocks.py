@@ -0,0 +1,217 @@
+import time
+
+# All clocks live in state["clocks"], one dict per name:
+#   {"direction": "up" | "down",
+#    "duration": 600.0,        count-down length in seconds ("down" only)
+#    "elapsed": 12.5,          seconds accumulated by earlier runs
+#    "running": True,
+#    "started_mono": 5321.2,   time.monotonic() at the last start
+#    "started_wall": 1.7e9,    time.time() at the last start
+#    "boot_id": "..."}         boot the monotonic value belongs to
+#
+# A running clock is measured with the monotonic clock, which is shared
+# by all processes of one boot and does not jump when NTP corrects the
+# wall clock (the Pi has no RTC and boots with a wrong time). Only after
+# a reboot, when the monotonic value is meaningless, the wall clock is
+# used instead.
+
+DIRECTIONS = ("up", "down")
+
+# Clocks every state has
+DEFAULT_CLOCKS = {
+    "game": "up",
+    "stopwatch": "up",
+    "timer": "down",
+    # Scroll position of the ticker (message playlist)
+    "ticker": "up",
+}
+
+
+def _read_boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+BOOT_ID = _read_boot_id()
+
+
+class Instant:
+    # One reading of both time bases. Everything shown in one frame or
+    # returned by one request is evaluated against the same Instant.
+
+    def __init__(self, wall, mono):
+        self.wall = wall
+        self.mono = mono
+
+
+def current_instant():
+    return Instant(time.time(), time.monotonic())
+
+
+def new_clock(direction="up", duration=0):
+    return {
+        "direction": direction,
+        "duration": float(duration),
+        "elapsed": 0.0,
+        "running": False,
+        "started_mono": None,
+        "started_wall": None,
+        "boot_id": None,
+    }
+
+
+def default_clocks():
+    return {name: new_clock(direction) for name, direction in DEFAULT_CLOCKS.items()}
+
+
+def get_clock(state, name, direction="up"):
+    # Returns the clock 'name', creating it if the state has none yet
+    clocks = state.setdefault("clocks", {})
+    clock = clocks.get(name)
+    if clock is None:
+        clock = clocks[name] = new_clock(DEFAULT_CLOCKS.get(name, direction))
+    return clock
+
+
+# --- Reading ---
+def _since_start(clock, instant):
+    if clock.get("boot_id") is not None and clock["boot_id"] == BOOT_ID:
+        return max(0.0, instant.mono - clock["started_mono"])
+    return max(0.0, instant.wall - (clock.get("started_wall") or instant.wall))
+
+
+def clock_elapsed(clock, instant):
+    elapsed = clock.get("elapsed", 0.0)
+    if clock.get("running"):
+        elapsed += _since_start(clock, instant)
+    if clock.get("direction") == "down":
+        elapsed = min(elapsed, clock.get("duration", 0.0))
+    return elapsed
+
+
+def read_clock(clock, instant):
+    # Derived values of one clock at 'instant' (what routes and frames
+    # show). A count-down that reached zero is "expired" and no longer
+    # counts as running.
+    elapsed = clock_elapsed(clock, instant)
+    reading = {
+        "direction": clock.get("direction", "up"),
+        "running": bool(clock.get("running")),
+        "elapsed": elapsed,
+        "remaining": None,
+        "expired": False,
+    }
+    if reading["direction"] == "down":
+        duration = clock.get("duration", 0.0)
+        reading["duration"] = duration
+        reading["remaining"] = max(0.0, duration - elapsed)
+        reading["expired"] = reading["running"] and reading["remaining"] <= 0
+        reading["running"] = reading["running"] and not reading["expired"]
+    return reading
+
+
+def read_clocks(state, instant):
+    # All clocks of 'state' evaluated at the same instant
+    clocks = state.get("clocks") or {}
+    readings = {name: read_clock(clock, instant) for name, clock in clocks.items()}
+    for name, direction in DEFAULT_CLOCKS.items():
+        if name not in readings:
+            readings[name] = read_clock(new_clock(direction), instant)
+    return readings
+
+
+# --- Changing (callers hold the state lock) ---
+def start_clock(clock, instant):
+    if clock.get("running"):
+        return
+    clock["running"] = True
+    clock["started_mono"] = instant.mono
+    clock["started_wall"] = instant.wall
+    clock["boot_id"] = BOOT_ID
+
+
+def stop_clock(clock, instant):
+    if clock.get("running"):
+        clock["elapsed"] = clock_elapsed(clock, instant)
+    clock["running"] = False
+    clock["started_mono"] = None
+    clock["started_wall"] = None
+    clock["boot_id"] = None
+
+
+def reset_clock(clock, duration=None, direction=None):
+    # Stops the clock and sets it back to zero (or to the full duration
+    # for a count-down). Optionally changes duration and direction.
+    clock.update(new_clock(
+        direction or clock.get("direction", "up"),
+        clock.get("duration", 0) if duration is None else duration,
+    ))
+
+
+# --- Old state files ---
+# Before state["clocks"] every clock had its own keys (stopwatch and game
+# clock in ms, timer in seconds).
+LEGACY_CLOCK_KEYS = {
+    # name: (running key, start key, start unit in seconds, elapsed key)
+    "stopwatch": ("stopwatch_running", "last_start_ts", 0.001, "elapsed_ms"),
+    "game": ("game_clock_running", "game_last_start_ts", 0.001, "game_elapsed_ms"),
+    "timer": ("timer_running", "timer_start_ts", 1.0, None),
+}
+
+
+def migrate_legacy_clocks(state):
+    # Converts the old keys into state["clocks"]. Running clocks keep
+    # running, measured from their wall clock start time.
+    if "clocks" in state:
+        return state
+
+    clocks = default_clocks()
+    for name, (running_key, start_key, unit, elapsed_key) in LEGACY_CLOCK_KEYS.items():
+        clock = clocks[name]
+        running = state.pop(running_key, False)
+        started = state.pop(start_key, None)
+        if elapsed_key is not None:
+            clock["elapsed"] = (state.pop(elapsed_key, 0) or 0) / 1000
+        if running and started:
+            clock["running"] = True
+            clock["started_wall"] = started * unit
+
+    # The old timer counted its remaining time down in timer_duration
+    clocks["timer"]["duration"] = float(state.pop("timer_duration", 0) or 0)
+
+    state["clocks"] = clocks
+    return state
+
+
+def legacy_clock_values(state, instant):
+    # The old derived keys (see LEGACY_CLOCK_KEYS) computed from the clocks
+    # at 'instant', for clients written against them. A running clock's
+    # start is reported as "now minus the time since its start", so
+    # elapsed + (now - start) is exactly the current value.
+    clocks = state.get("clocks") or {}
+    values = {}
+    readings = {}
+    for name, (running_key, start_key, unit, elapsed_key) in LEGACY_CLOCK_KEYS.items():
+        clock = clocks.get(name) or new_clock(DEFAULT_CLOCKS[name])
+        reading = readings[name] = read_clock(clock, instant)
+        started = None
+        if reading["running"]:
+            started = (instant.wall - _since_start(clock, instant)) / unit
+            if unit != 1.0:
+                started = int(started)
+        values[running_key] = reading["running"]
+        values[start_key] = started
+        if elapsed_key is not None:
+            values[elapsed_key] = int(clock.get("elapsed", 0.0) * 1000)
+
+    values["current_elapsed_ms"] = int(readings["stopwatch"]["elapsed"] * 1000)
+    values["game_current_elapsed_ms"] = int(readings["game"]["elapsed"] * 1000)
+    # The old timer counted down from timer_duration, the time left at
+    # its last start
+    timer = clocks.get("timer") or new_clock("down")
+    values["timer_duration"] = max(0.0, timer.get("duration", 0.0) - timer.get("elapsed", 0.0))
+    values["remaining_seconds"] = readings["timer"]["remaining"]
+    return values
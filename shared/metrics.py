@@ -0,0 +1,143 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the histogram buckets
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _HistogramSeries:
+    # One label combination of a Histogram. observe() is a bisect and a few
+    # additions under a lock, cheap enough for every frame and request.
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._lock = threading.Lock()
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def cumulative_counts(self):
+        with self._lock:
+            counts = list(self._counts)
+        total = 0
+        for count in counts:
+            total += count
+            yield total
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, _HistogramSeries(self.buckets))
+        return series
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def render(self, prefix):
+        name = prefix + self.name
+        lines = [
+            f"# HELP {name} {self.documentation}",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            series_items = sorted(self._series.items(), key=lambda item: item[0])
+        for values, series in series_items:
+            bounds = self.buckets + (float("inf"),)
+            for bound, count in zip(bounds, series.cumulative_counts()):
+                labels = _format_labels(self.labelnames, values, ("le", _format_value(bound)))
+                lines.append(f"{name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{name}_sum{labels} {series.sum!r}")
+            lines.append(f"{name}_count{labels} {series.count}")
+        return lines
+
+
+class Registry:
+    # Collection of histograms rendered in the Prometheus text format.
+    # 'prefix' is put in front of every metric name, so the server and the
+    # display can share metric definitions without clashing.
+
+    def __init__(self, prefix="scoreboard_"):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Histogram(name, documentation, labelnames, buckets)
+                self._metrics[name] = metric
+            return metric
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render(self.prefix))
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # Atomically replaces 'path' with the current metrics
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+# Process-wide registry
+REGISTRY = Registry()
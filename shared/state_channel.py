@@ -0,0 +1,202 @@
+import copy
+import json
+import os
+import select
+import socket
+import threading
+
+# Messages are newline-delimited JSON objects:
+#   {"version": 7, "full": {...}}                     complete state
+#   {"version": 8, "base": 7, "set": {...}, "unset": [...]}
+# A diff only replaces top-level keys. A subscriber that sees a diff whose
+# "base" is not its current version reconnects and gets a full state.
+
+SEND_TIMEOUT = 1.0
+
+
+def state_diff(old, new):
+    changed = {key: value for key, value in new.items() if old.get(key) != value}
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+def _encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+class StatePublisher:
+    # Server side: pushes state changes to every connected display over a
+    # Unix domain socket. publish() only hands the state to a sender
+    # thread, so slow or dead displays never block a request. Bursts are
+    # coalesced: only the newest state is sent.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending = None
+        self._sent = None
+        self._clients = []
+        self._closed = False
+
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+
+        threading.Thread(target=self._accept_loop, name="state-accept", daemon=True).start()
+        threading.Thread(target=self._send_loop, name="state-publish", daemon=True).start()
+
+    def publish(self, state):
+        with self._lock:
+            self._pending = copy.deepcopy(state)
+            self._changed.notify()
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            conn.settimeout(SEND_TIMEOUT)
+
+            with self._lock:
+                # New subscribers start with the complete state
+                if self._sent is not None and not self._send(conn, self._full_message(self._sent)):
+                    continue
+                self._clients.append(conn)
+
+    def _full_message(self, state):
+        return _encode({"version": state.get("version", 0), "full": state})
+
+    def _send(self, conn, data):
+        try:
+            conn.sendall(data)
+            return True
+        except OSError:
+            conn.close()
+            return False
+
+    def _send_loop(self):
+        while True:
+            with self._lock:
+                while self._pending is None and not self._closed:
+                    self._changed.wait()
+                if self._closed:
+                    return
+                state, self._pending = self._pending, None
+                previous, self._sent = self._sent, state
+                clients = list(self._clients)
+
+            if previous is None:
+                data = self._full_message(state)
+            else:
+                changed, removed = state_diff(previous, state)
+                data = _encode({
+                    "version": state.get("version", 0),
+                    "base": previous.get("version", 0),
+                    "set": changed,
+                    "unset": removed,
+                })
+
+            dead = [conn for conn in clients if not self._send(conn, data)]
+            if dead:
+                with self._lock:
+                    self._clients = [c for c in self._clients if c not in dead]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._changed.notify()
+            for conn in self._clients:
+                conn.close()
+            self._clients = []
+        self._server.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class StateSubscriber:
+    # Display side: receives state from the server's StatePublisher.
+    # All socket operations are non-blocking; when the server is not
+    # running, connected is False and the caller falls back to the file.
+
+    def __init__(self, path):
+        self.path = path
+        self.state = None
+        self._sock = None
+        self._buffer = b""
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            return False
+        sock.setblocking(False)
+        self._sock = sock
+        self._buffer = b""
+        return True
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._buffer = b""
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def wait(self, timeout):
+        # True as soon as data arrives (or the connection drops)
+        if self._sock is None:
+            return False
+        readable, _, _ = select.select([self._sock], [], [], timeout)
+        return bool(readable)
+
+    def poll(self):
+        # Returns (state, changed), applying every message received so far
+        if self._sock is None:
+            return self.state, False
+
+        while True:
+            try:
+                chunk = self._sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                chunk = b""
+            if not chunk:
+                # Server went away
+                self._disconnect()
+                return self.state, False
+            self._buffer += chunk
+
+        changed = False
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            message = json.loads(line)
+            if "full" in message:
+                self.state = message["full"]
+            elif self.state is not None and message["base"] == self.state.get("version", 0):
+                state = dict(self.state)
+                state.update(message["set"])
+                for key in message["unset"]:
+                    state.pop(key, None)
+                self.state = state
+            else:
+                # Missed a message: reconnect to get the full state
+                self._disconnect()
+                return self.state, changed
+            changed = True
+
+        return self.state, changed
+
+    def close(self):
+        self._disconnect()
@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+from metrics import REGISTRY
+
+# Bump when the layout of state.json changes incompatibly
+SCHEMA_VERSION = 1
+
+STATE_READ_SECONDS = REGISTRY.histogram(
+    "state_read_duration_seconds", "Time to read and parse state.json"
+)
+STATE_WRITE_SECONDS = REGISTRY.histogram(
+    "state_write_duration_seconds", "Time to write state.json", ("fsync",)
+)
+
+
+def write_state(path, state, fsync=False):
+    # Writes 'state' to a temp file next to 'path' and renames it over the
+    # old file. Readers see either the old or the new file, never a
+    # half-written one. With fsync=True the data and the rename are forced
+    # to disk before returning (durability point).
+    start = time.perf_counter()
+    data = dict(state)
+    data["schema_version"] = SCHEMA_VERSION
+
+    directory = os.path.dirname(path) or "."
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    if fsync:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    STATE_WRITE_SECONDS.labels(fsync).observe(time.perf_counter() - start)
+
+
+def read_state(path):
+    # Returns the parsed state, or None if the file is missing or not a
+    # valid state file. Callers keep their last good state in that case
+    # and must never write defaults over the file.
+    try:
+        with STATE_READ_SECONDS.time():
+            with open(path, "r") as f:
+                data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(data, dict):
+        return None
+    if data.get("schema_version", SCHEMA_VERSION) > SCHEMA_VERSION:
+        return None
+    return data
+
+
+def state_version(state):
+    # Monotonically increasing sequence number, bumped on every change
+    if not state:
+        return 0
+    return state.get("version", 0)
+
+
+# --- Boards ---
+# One server can drive several boards (courts). The default board uses
+# the state file itself; every other board has its own directory next
+# to it: boards/<board_id>/state.json (plus state.sock, state.log, ...).
+DEFAULT_BOARD = "main"
+
+
+def board_state_file(state_file, board_id):
+    if board_id == DEFAULT_BOARD:
+        return state_file
+    return os.path.join(os.path.dirname(state_file), "boards", board_id, "state.json")